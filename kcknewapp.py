@@ -1,10 +1,56 @@
+import time
+_SCRIPT_STARTED = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
 import os
-from datetime import datetime
+import base64
+import calendar
+import csv
+import gzip
+import hashlib
+import hmac
+import importlib
+import json
+import sys
+from datetime import date, datetime, timedelta
 import re
+import tempfile
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from io import BytesIO
 
+# Seconds spent importing each lazy module during this script run
+IMPORT_SECONDS = {}
+
+class LazyModule:
+    """Import a module on first attribute access, so pages that never use it don't pay for it.
+
+    Kept out of sys.modules until then: Streamlit's first-element check walks
+    sys.modules via inspect, which would trigger an importlib LazyLoader stub.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            started = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            IMPORT_SECONDS[self._name] = time.perf_counter() - started
+        return getattr(self._module, attr)
+
+def lazy_module(name):
+    return sys.modules.get(name) or LazyModule(name)
+
+# pandas/numpy (and openpyxl, pulled in by read_excel) load on the first page
+# that touches data; the login page renders without them
+pd = lazy_module("pandas")
+np = lazy_module("numpy")
+
 # Page configuration
 st.set_page_config(
     page_title="School Management System",
@@ -12,39 +58,78 @@ st.set_page_config(
     layout="wide"
 )
 
-# Admin credentials
+# Initial admin account, created with the user store on first run
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "ADMIN001"
 
+# Main menu sections each role can open
+ROLES = {
+    'admin': ["👨‍🎓 Student Management", "💰 Fees Management", "📅 Attendance", "🕓 Audit Log", "👥 Users", "💾 Backups", "🩺 Data Integrity"],
+    'front_desk': ["👨‍🎓 Student Management", "📅 Attendance"],
+    'accounts': ["💰 Fees Management"],
+}
+
+# Login throttling and password hashing cost
+MAX_LOGIN_ATTEMPTS = 5
+MAX_LOGIN_ATTEMPTS_PER_IP = 20
+LOGIN_WINDOW_SECONDS = 15 * 60
+# Set to True only when served behind a reverse proxy that appends the
+# client address to X-Forwarded-For; otherwise the header is client-controlled
+TRUSTED_PROXY = False
+LOGIN_BUDGET_SECONDS = 0.25
+SCRYPT_MIN_N = 2 ** 14
+SCRYPT_MAX_N = 2 ** 17
+
 # Initialize session state for login
 def init_session_state():
     if 'logged_in' not in st.session_state:
         st.session_state.logged_in = False
-    if 'login_attempts' not in st.session_state:
-        st.session_state.login_attempts = 0
+    if 'role' not in st.session_state:
+        st.session_state.role = None
 
 def check_url_params():
     try:
         query_params = st.query_params
         if 'logout' in query_params or 'reset' in query_params:
             st.session_state.logged_in = False
-            st.session_state.login_attempts = 0
+            st.session_state.role = None
             st.query_params.clear()
             st.rerun()
     except:
         pass
 
-init_session_state()
-check_url_params()
-
 STUDENT_FILE = "students_data.xlsx"
 FEE_STRUCTURE_FILE = "fee_structure.xlsx"
 FEE_PAYMENTS_FILE = "fee_payments.xlsx"
+ATTENDANCE_FILE = "attendance_data.npz"
+ROLLUP_FILE = "collection_rollups.xlsx"
+AUDIT_DIR = "audit_log"
+AUDIT_CURRENT_FILE = os.path.join(AUDIT_DIR, "current.jsonl")
+AUDIT_INDEX_FILE = os.path.join(AUDIT_DIR, "index.json")
+AUDIT_SEGMENT_BYTES = 512 * 1024
+ARCHIVE_DIR = "archive"
+ARCHIVE_INDEX_FILE = os.path.join(ARCHIVE_DIR, "index.json")
+USERS_FILE = "users.json"
+STARTUP_METRICS_FILE = "startup_metrics.csv"
+BACKUP_DIR = "backups"
+BACKUP_OBJECTS_DIR = os.path.join(BACKUP_DIR, "objects")
+BACKUP_SNAPSHOTS_DIR = os.path.join(BACKUP_DIR, "snapshots")
+BACKUP_CHUNK_MASK = 0x3F
+BACKUP_MAX_CHUNK = 1024 * 1024
+BACKUP_INTERVAL_HOURS = 24
+BACKUP_KEEP_DAYS = 14
+BACKUP_KEEP_MONTHS = 12
+INTEGRITY_STATE_FILE = "integrity_state.json"
 
 STANDARDS = ["Playgroup", "Nursery", "Junior KG", "Senior KG", "1st", "2nd"]
 AGE_OPTIONS = [2, 3, 4, 5, 6, 7, 8, 9, 10]
 FEE_TYPES = ["Admission Fees", "Tuition Fees", "Activity Fees", "Uniform Fees", "Stationary", "Term Fees", "Lunch Fees"]
 PAYMENT_MODES = ["Cash", "Online/UPI", "Cheque", "Card", "Bank Transfer"]
+BLOOD_GROUPS = ["A+", "A-", "B+", "B-", "O+", "O-", "AB+", "AB-"]
+
+SCHOOL_NAME = "School Management System"
+PDF_ROWS_PER_PAGE = 30
+PDF_WORKERS = min(8, (os.cpu_count() or 1) + 4)
 
 # ============================================================================
 # INITIALIZE EXCEL FILES
@@ -80,9 +165,33 @@ def initialize_fee_payments():
 
 def get_next_student_id():
     students_df = initialize_student_excel()
-    if len(students_df) == 0:
+    last_id = max(int(students_df['Student_ID'].max()) if len(students_df) > 0 else 0, archived_max_id('students'))
+    if last_id == 0:
         return 1001
-    return int(students_df['Student_ID'].max()) + 1
+    return last_id + 1
+
+def get_next_payment_id(pay_df):
+    return max(int(pay_df['Payment_ID'].max()) if len(pay_df) > 0 else 0, archived_max_id('payments')) + 1
+
+def option_index(options, value):
+    """Position of value in a selectbox's options, or 0 when it is missing or out of range."""
+    try:
+        return options.index(value)
+    except ValueError:
+        return 0
+
+def issue_download(key, owner_id, file_name, data):
+    """Keep a just-rendered document in the session so reruns don't render it again."""
+    st.session_state[key] = {'owner': owner_id, 'file_name': file_name, 'data': data}
+
+def offer_download(key, owner_id, label, mime):
+    # Only offered for the record it was issued to; selecting another drops it.
+    # Called outside forms, which cannot hold download buttons
+    document = st.session_state.get(key)
+    if document and document['owner'] != owner_id:
+        del st.session_state[key]
+    elif document:
+        st.download_button(label=label, data=document['data'], file_name=document['file_name'], mime=mime)
 
 def validate_phone(phone):
     pattern = r'^[0-9]{10}$'
@@ -92,60 +201,525 @@ def validate_aadhar(aadhar):
     pattern = r'^\d{12}$'
     return bool(re.match(pattern, str(aadhar).replace(" ", "")))
 
+# ============================================================================
+# STYLES & ASSETS
+# ============================================================================
+
+LOGIN_CSS = """
+.login-container {
+    display: flex;
+    justify-content: center;
+    align-items: center;
+    min-height: 100vh;
+}
+.login-box {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    padding: 40px;
+    border-radius: 15px;
+    box-shadow: 0 8px 32px 0 rgba(31, 38, 135, 0.37);
+    width: 100%;
+    max-width: 400px;
+    color: white;
+}
+.login-title {
+    text-align: center;
+    font-size: 2em;
+    font-weight: bold;
+    margin-bottom: 30px;
+}
+.logo-container {
+    text-align: center;
+    margin-bottom: 30px;
+}
+.logo-placeholder {
+    width: 120px;
+    height: 120px;
+    background: linear-gradient(135deg, rgba(255,255,255,0.2), rgba(255,255,255,0.1));
+    border: 3px dashed white;
+    border-radius: 15px;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    font-size: 60px;
+    margin: 0 auto;
+    box-shadow: 0 4px 15px rgba(0,0,0,0.2);
+}
+.logo-img-login {
+    width: 120px;
+    height: 120px;
+    object-fit: contain;
+    border-radius: 15px;
+    box-shadow: 0 4px 15px rgba(0,0,0,0.2);
+}
+"""
+
+# Dark Theme Styling - BLACK BACKGROUND
+DARK_THEME_CSS = """
+/* Main background - BLACK */
+.main {
+    background-color: #1a1a1a !important;
+}
+
+/* App container - BLACK */
+[data-testid="stAppViewContainer"] {
+    background-color: #1a1a1a !important;
+    color: #ffffff !important;
+}
+
+/* Headers - WHITE TEXT */
+h1, h2, h3, h4, h5, h6 {
+    color: #ffffff !important;
+}
+
+/* Text - WHITE */
+p, span, label {
+    color: #ffffff !important;
+}
+
+/* Input fields - DARK BACKGROUND */
+input, textarea, select {
+    background-color: #2a2a2a !important;
+    color: #ffffff !important;
+    border-color: #444444 !important;
+}
+
+/* Dataframe - DARK */
+[data-testid="stDataFrame"] {
+    background-color: #2a2a2a !important;
+}
+
+/* Info/Success/Error boxes */
+[data-testid="stAlert"] {
+    background-color: #2a2a2a !important;
+    color: #ffffff !important;
+}
+"""
+
+# RESPONSIVE LAYOUT BASED ON DEVICE MODE
+DEVICE_CSS = {
+    'desktop': """
+        /* Desktop - Full width, large fonts */
+        body { font-size: 16px !important; }
+        h1 { font-size: 48px !important; }
+        h2 { font-size: 36px !important; }
+        h3 { font-size: 28px !important; }
+        .stButton button { font-size: 16px !important; padding: 12px 24px !important; }
+        .stSelectbox { font-size: 16px !important; }
+        .stTextInput input { font-size: 16px !important; }
+        [data-testid="stMetric"] { font-size: 18px !important; }
+    """,
+    'tablet': """
+        /* Tablet - Medium width, medium fonts */
+        body { font-size: 14px !important; }
+        h1 { font-size: 36px !important; }
+        h2 { font-size: 28px !important; }
+        h3 { font-size: 22px !important; }
+        .stButton button { font-size: 14px !important; padding: 10px 20px !important; }
+        .stSelectbox { font-size: 14px !important; }
+        .stTextInput input { font-size: 14px !important; }
+        [data-testid="stMetric"] { font-size: 14px !important; }
+    """,
+    'mobile': """
+        /* Mobile - Narrow width, small fonts */
+        body { font-size: 12px !important; }
+        h1 { font-size: 28px !important; }
+        h2 { font-size: 20px !important; }
+        h3 { font-size: 16px !important; }
+        .stButton button { font-size: 12px !important; padding: 8px 16px !important; }
+        .stSelectbox { font-size: 12px !important; }
+        .stTextInput input { font-size: 12px !important; }
+        [data-testid="stMetric"] { font-size: 12px !important; }
+    """,
+}
+
+# Sidebar Navigation - DARK THEME (BLACK BACKGROUND)
+SIDEBAR_CSS = """
+/* General sidebar styling - BLACK BACKGROUND, NO GLASSMORPHISM */
+[data-testid="stSidebar"] {
+    background: #1a1a1a !important;
+    backdrop-filter: none !important;
+}
+
+[data-testid="stSidebar"]{
+    font-size: 24px !important;
+}
+
+[data-testid="stSidebar"] label {
+    font-size: 24px !important; 
+    font-weight: 800 !important;
+    color: #ffffff !important;
+    letter-spacing: 0.5px !important;
+}
+
+/* MAIN MENU AND OPERATIONS HEADERS - BALANCED SIZE */
+[data-testid="stSidebar"] .stRadio > label {
+    font-size: 48px !important;
+    font-weight: 900 !important;
+    color: #ffffff !important;
+    text-shadow: 2px 2px 4px rgba(0,0,0,0.1) !important;
+    letter-spacing: 1px !important;
+    -webkit-text-stroke: 1px rgba(0,0,0,0.3) !important;
+    line-height: 1.2 !important;
+    font-family: 'Poppins', 'Arial Black', 'Roboto Black', sans-serif !important;
+    margin: 15px 0 !important;
+    padding: 10px 5px !important;
+    text-transform: uppercase !important;
+    word-wrap: break-word !important;
+}
+
+/* MENU ITEMS - LARGE BUT READABLE */
+[data-testid="stSidebar"] .stRadio div[role="radiogroup"] label {
+    font-size: 56px !important;
+    padding: 12px 8px !important;
+    font-weight: 900 !important;
+    color: #ffffff !important;
+    text-shadow: 2px 2px 4px rgba(0,0,0,0.1) !important;
+    -webkit-text-stroke: 1px rgba(0,0,0,0.3) !important;
+    line-height: 1.3 !important;
+    font-family: 'Poppins', 'Arial Black', 'Roboto Black', sans-serif !important;
+    margin: 8px 0 !important;
+    border-radius: 6px !important;
+    transition: all 0.3s ease !important;
+    text-transform: capitalize !important;
+}
+
+/* Menu item hover effect - ENHANCED */
+[data-testid="stSidebar"] .stRadio div[role="radiogroup"] label:hover {
+    background-color: rgba(45, 90, 160, 0.15) !important;
+    transform: scale(1.05) !important;
+    letter-spacing: 1px !important;
+    color: #ffffff !important;
+    box-shadow: 0 2px 8px rgba(45, 90, 160, 0.3) !important;
+}
+
+/* Selected menu item styling - GOLD ACCENT */
+[data-testid="stSidebar"] .stRadio div[role="radiogroup"] label[aria-checked="true"] {
+    background-color: rgba(255, 215, 0, 0.2) !important;
+    border-left: 4px solid #ffd700 !important;
+    padding-left: 10px !important;
+    color: #ffffff !important;
+    box-shadow: 0 2px 8px rgba(255, 215, 0, 0.3) !important;
+}
+
+/* Sidebar title styling */
+[data-testid="stSidebar"] h1 {
+    font-size: 36px !important;
+    font-weight: 900 !important;
+    color: #ffffff !important;
+    text-shadow: 1px 1px 3px rgba(0,0,0,0.1) !important;
+    -webkit-text-stroke: 0.8px rgba(0,0,0,0.2) !important;
+    font-family: 'Poppins', 'Arial Black', 'Roboto Black', sans-serif !important;
+    margin-bottom: 15px !important;
+    letter-spacing: 1px !important;
+    text-transform: uppercase !important;
+}
+
+/* Paragraph text in sidebar */
+[data-testid="stSidebar"] p {
+    font-size: 18px !important;
+    font-weight: 700 !important;
+    color: #ffffff !important;
+    margin: 8px 0 !important;
+}
+
+/* Streamlit radio button styling */
+[data-testid="stSidebar"] .stRadio {
+    background-color: transparent !important;
+}
+
+/* Device Switcher Styling */
+.device-switcher {
+    display: flex;
+    gap: 10px;
+    justify-content: center;
+    align-items: center;
+    margin: 20px 0;
+    padding: 15px;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    border-radius: 10px;
+    box-shadow: 0 4px 15px rgba(102, 126, 234, 0.3);
+}
+
+.device-btn {
+    background: rgba(255, 255, 255, 0.2);
+    border: 2px solid #ffffff;
+    color: #ffffff;
+    padding: 10px 15px;
+    border-radius: 8px;
+    cursor: pointer;
+    font-size: 20px;
+    font-weight: bold;
+    transition: all 0.3s ease;
+    text-align: center;
+    width: 60px;
+}
+
+.device-btn:hover {
+    background: rgba(255, 255, 255, 0.4);
+    transform: scale(1.1);
+    box-shadow: 0 4px 12px rgba(255, 255, 255, 0.3);
+}
+
+.device-btn.active {
+    background: #ffd700;
+    color: #667eea;
+    border-color: #ffd700;
+    box-shadow: 0 4px 15px rgba(255, 215, 0, 0.5);
+}
+"""
+
+# Poppins is served from static/fonts when the .woff2 files are present and
+# otherwise resolved from locally installed fonts, falling back to the system
+# stack in the font-family rules, so the app never fetches fonts remotely.
+SELF_HOSTED_FONTS = [
+    ("Poppins", 700, "Poppins Bold", "Poppins-Bold.woff2"),
+    ("Poppins", 800, "Poppins ExtraBold", "Poppins-ExtraBold.woff2"),
+    ("Poppins", 900, "Poppins Black", "Poppins-Black.woff2"),
+]
+FONT_DIR = os.path.join("static", "fonts")
+
+def _minify_css(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    return re.sub(r'\s*([{};,>])\s*', r'\1', css).strip()
+
+def _font_face_css():
+    rules = []
+    for family, weight, local_name, filename in SELF_HOSTED_FONTS:
+        sources = [f'local("{local_name}")']
+        if os.path.exists(os.path.join(FONT_DIR, filename)):
+            sources.append(f'url("app/static/fonts/{filename}") format("woff2")')
+        rules.append(f'@font-face {{ font-family: "{family}"; font-weight: {weight}; font-display: swap; src: {", ".join(sources)}; }}')
+    return "\n".join(rules)
+
+@st.cache_resource(show_spinner=False)
+def login_css():
+    return f"<style>{_minify_css(LOGIN_CSS)}</style>"
+
+@st.cache_resource(show_spinner=False)
+def app_css(device_mode):
+    css = _font_face_css() + DARK_THEME_CSS + DEVICE_CSS[device_mode] + SIDEBAR_CSS
+    return f"<style>{_minify_css(css)}</style>"
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def encoded_logo(path, mtime):
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode()
+
+# ============================================================================
+# USERS & AUTHENTICATION
+# ============================================================================
+
+# Passwords are stored as scrypt hashes ("scrypt$n$r$p$salt$hash"), so the
+# cost factor travels with each hash. New hashes use the largest n that fits
+# LOGIN_BUDGET_SECONDS on this machine. Failed logins are counted per user
+# and per client IP in a process-wide store shared by all browser sessions.
+
+def _b64(data):
+    return base64.b64encode(data).decode()
+
+@st.cache_resource(show_spinner=False)
+def scrypt_cost():
+    """Largest scrypt n (r=8, p=1) that keeps a hash within the login latency budget."""
+    n = SCRYPT_MIN_N
+    while n < SCRYPT_MAX_N:
+        started = time.perf_counter()
+        hashlib.scrypt(b"calibration", salt=b"\0" * 16, n=n, r=8, p=1, maxmem=256 * 8 * n)
+        if 2 * (time.perf_counter() - started) > LOGIN_BUDGET_SECONDS:
+            break
+        n *= 2
+    return n
+
+def hash_password(password):
+    n, r, p = scrypt_cost(), 8, 1
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * r * n)
+    return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(digest)}"
+
+def verify_password(password, stored):
+    # A corrupted hash fails the login instead of raising
+    try:
+        _, n, r, p, salt, digest = stored.split('$')
+        n, r, p = int(n), int(r), int(p)
+        expected = base64.b64decode(digest, validate=True)
+        candidate = hashlib.scrypt(password.encode(), salt=base64.b64decode(salt, validate=True), n=n, r=r, p=p, maxmem=256 * r * n)
+    except (ValueError, AttributeError):
+        return False
+    return hmac.compare_digest(candidate, expected)
+
+@st.cache_resource(show_spinner=False)
+def _dummy_hash():
+    # Unknown usernames are checked against this so they take as long as real ones
+    return hash_password(os.urandom(16).hex())
+
+def initialize_users():
+    if not os.path.exists(USERS_FILE):
+        users = [{
+            'Username': ADMIN_USERNAME,
+            'Password_Hash': hash_password(ADMIN_PASSWORD),
+            'Role': 'admin',
+            'Active': True,
+            'Default_Password': True
+        }]
+        save_users(users)
+        return users
+    else:
+        return _read_users(file_version(USERS_FILE))
+
+# Kept as JSON rather than Excel so the login page needs neither pandas nor openpyxl
+@st.cache_data(show_spinner=False, max_entries=1)
+def _read_users(version):
+    with open(USERS_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_users(users):
+    tmp_path = USERS_FILE + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(users, f, indent=1, default=_audit_value)
+    os.replace(tmp_path, USERS_FILE)
+
+def authenticate(username, password):
+    """Return the user's role if the credentials are valid, otherwise None."""
+    user = next((u for u in initialize_users() if u['Username'] == username and u['Active']), None)
+    stored = user['Password_Hash'] if user else _dummy_hash()
+    if verify_password(password, stored) and user:
+        return user['Role']
+    return None
+
+@st.cache_resource(show_spinner=False)
+def login_attempts_store():
+    return {'lock': threading.Lock(), 'failures': {}}
+
+def client_ip():
+    """The client's address, or None when it cannot tell clients apart.
+
+    Behind a TRUSTED_PROXY the last X-Forwarded-For hop is the one the proxy
+    appended; earlier hops are whatever the client sent. A localhost desk
+    setup reports no address.
+    """
+    try:
+        forwarded = st.context.headers.get('X-Forwarded-For') if TRUSTED_PROXY else None
+        ip = forwarded.split(',')[-1].strip() if forwarded else st.context.ip_address
+    except AttributeError:
+        return None
+    if not ip or ip in ("127.0.0.1", "::1"):
+        return None
+    return ip
+
+def _failure_keys(username, ip):
+    # Without a real client address only the per-username limit applies;
+    # a shared bucket would let anyone's typos lock out every user
+    keys = [(f"user:{username.lower()}", MAX_LOGIN_ATTEMPTS)]
+    if ip:
+        keys.append((f"ip:{ip}", MAX_LOGIN_ATTEMPTS_PER_IP))
+    return keys
+
+def _recent_failures(store, key, now):
+    failures = [t for t in store['failures'].get(key, []) if now - t < LOGIN_WINDOW_SECONDS]
+    store['failures'][key] = failures
+    return failures
+
+def login_lockout(username, ip):
+    """Seconds until another attempt is allowed for this user/IP, or 0."""
+    store, now = login_attempts_store(), time.time()
+    with store['lock']:
+        waits = [
+            LOGIN_WINDOW_SECONDS - (now - failures[-limit])
+            for failures, limit in [(_recent_failures(store, key, now), limit) for key, limit in _failure_keys(username, ip)]
+            if len(failures) >= limit
+        ]
+    return int(max(waits, default=0))
+
+def record_login_failure(username, ip):
+    """Count a failed attempt; returns the attempts left for this username."""
+    store, now = login_attempts_store(), time.time()
+    with store['lock']:
+        for key, _ in _failure_keys(username, ip):
+            _recent_failures(store, key, now).append(now)
+        user_failures = _recent_failures(store, f"user:{username.lower()}", now)
+    return MAX_LOGIN_ATTEMPTS - len(user_failures)
+
+def clear_login_failures(username):
+    store = login_attempts_store()
+    with store['lock']:
+        store['failures'].pop(f"user:{username.lower()}", None)
+
+def manage_users():
+    st.header("👥 Manage Users")
+    users_df = pd.DataFrame(initialize_users())
+    
+    st.dataframe(users_df.drop(columns=['Password_Hash']), use_container_width=True, hide_index=True)
+    
+    st.subheader("Add User")
+    with st.form("add_user_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            username = st.text_input("Username *")
+            role = st.selectbox("Role *", list(ROLES))
+        with col2:
+            password = st.text_input("Password *", type="password")
+            confirm = st.text_input("Confirm Password *", type="password")
+        
+        submitted = st.form_submit_button("➕ Add User")
+        
+        if submitted:
+            if not all([username, password]):
+                st.error("❌ Please fill all required fields!")
+            elif username in users_df['Username'].tolist():
+                st.error("❌ Username already exists!")
+            elif password != confirm:
+                st.error("❌ Passwords do not match!")
+            elif len(password) < 8:
+                st.error("❌ Password must be at least 8 characters!")
+            else:
+                new_user = {'Username': username, 'Role': role, 'Active': True, 'Default_Password': False}
+                users_df = pd.concat([users_df, pd.DataFrame([{**new_user, 'Password_Hash': hash_password(password)}])], ignore_index=True)
+                save_users(users_df.to_dict('records'))
+                record_audit([audit_entry('user', username, after=new_user)])
+                st.success(f"✅ User {username} added!")
+    
+    st.subheader("Update User")
+    with st.form("update_user_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            username = st.selectbox("User", users_df['Username'].tolist())
+            role = st.selectbox("Role", ["(unchanged)"] + list(ROLES))
+            active = st.selectbox("Status", ["(unchanged)", "Active", "Disabled"])
+        with col2:
+            password = st.text_input("New Password (leave blank to keep)", type="password")
+            confirm = st.text_input("Confirm New Password", type="password")
+        
+        submitted = st.form_submit_button("✅ Update User")
+        
+        if submitted:
+            if password and password != confirm:
+                st.error("❌ Passwords do not match!")
+            elif password and len(password) < 8:
+                st.error("❌ Password must be at least 8 characters!")
+            elif username == st.session_state.username and (active == "Disabled" or role not in ("(unchanged)", "admin")):
+                st.error("❌ You cannot disable or demote your own account!")
+            else:
+                mask = users_df['Username'] == username
+                before = users_df.loc[mask, ['Role', 'Active']].iloc[0].to_dict()
+                if role != "(unchanged)":
+                    users_df.loc[mask, 'Role'] = role
+                if active != "(unchanged)":
+                    users_df.loc[mask, 'Active'] = active == "Active"
+                after = users_df.loc[mask, ['Role', 'Active']].iloc[0].to_dict()
+                if password:
+                    users_df.loc[mask, 'Password_Hash'] = hash_password(password)
+                    users_df.loc[mask, 'Default_Password'] = False
+                    before['Password'], after['Password'] = "", "changed"
+                save_users(users_df.to_dict('records'))
+                record_audit([audit_entry('user', username, before, after)])
+                st.success(f"✅ User {username} updated!")
+
 # ============================================================================
 # LOGIN PAGE
 # ============================================================================
 
 def login_page():
-    st.markdown("""
-        <style>
-        .login-container {
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            min-height: 100vh;
-        }
-        .login-box {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            padding: 40px;
-            border-radius: 15px;
-            box-shadow: 0 8px 32px 0 rgba(31, 38, 135, 0.37);
-            width: 100%;
-            max-width: 400px;
-            color: white;
-        }
-        .login-title {
-            text-align: center;
-            font-size: 2em;
-            font-weight: bold;
-            margin-bottom: 30px;
-        }
-        .logo-container {
-            text-align: center;
-            margin-bottom: 30px;
-        }
-        .logo-placeholder {
-            width: 120px;
-            height: 120px;
-            background: linear-gradient(135deg, rgba(255,255,255,0.2), rgba(255,255,255,0.1));
-            border: 3px dashed white;
-            border-radius: 15px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 60px;
-            margin: 0 auto;
-            box-shadow: 0 4px 15px rgba(0,0,0,0.2);
-        }
-        .logo-img-login {
-            width: 120px;
-            height: 120px;
-            object-fit: contain;
-            border-radius: 15px;
-            box-shadow: 0 4px 15px rgba(0,0,0,0.2);
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    st.markdown(login_css(), unsafe_allow_html=True)
 
     col1, col2, col3 = st.columns([1, 2, 1])
     
@@ -155,9 +729,7 @@ def login_page():
         st.markdown("<div class='logo-container'>", unsafe_allow_html=True)
         
         if os.path.exists(logo_path):
-            import base64
-            with open(logo_path, "rb") as f:
-                img_data = base64.b64encode(f.read()).decode()
+            img_data = encoded_logo(logo_path, os.path.getmtime(logo_path))
             st.markdown(f'<img src="data:image/png;base64,{img_data}" class="logo-img-login">', unsafe_allow_html=True)
         else:
             st.markdown("<div class='logo-placeholder'>🏫</div>", unsafe_allow_html=True)
@@ -170,20 +742,30 @@ def login_page():
         password = st.text_input("🔐 Password", type="password", key="password_input")
         
         if st.button("🔓 Login", use_container_width=True):
-            if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
-                st.session_state.logged_in = True
-                st.session_state.login_attempts = 0
-                st.rerun()
+            ip = client_ip()
+            wait = login_lockout(username, ip)
+            if wait > 0:
+                st.error(f"🚫 Too many failed attempts. Try again in {wait // 60 + 1} minutes or contact administrator.")
             else:
-                st.session_state.login_attempts += 1
-                remaining = 5 - st.session_state.login_attempts
-                
-                if st.session_state.login_attempts >= 5:
-                    st.error("🚫 Too many failed attempts. Please contact administrator.")
+                # Verified once here; reruns rely on the session flags below
+                role = authenticate(username, password)
+                if role in ROLES:
+                    clear_login_failures(username)
+                    st.session_state.logged_in = True
+                    st.session_state.username = username
+                    st.session_state.role = role
+                    st.rerun()
                 else:
-                    st.error(f"❌ Invalid credentials! {remaining} attempts remaining.")
-        st.markdown("---")
-        st.info("**Default Credentials:**\n\n👤 Username: admin\n\n🔐 Password: ADMIN001")
+                    remaining = record_login_failure(username, ip)
+                    
+                    if remaining <= 0:
+                        st.error("🚫 Too many failed attempts. Please contact administrator.")
+                    else:
+                        st.error(f"❌ Invalid credentials! {remaining} attempts remaining.")
+        
+        if any(user.get('Default_Password') for user in initialize_users()):
+            st.markdown("---")
+            st.info(f"**Default Credentials:**\n\n👤 Username: {ADMIN_USERNAME}\n\n🔐 Password: {ADMIN_PASSWORD}\n\nChange this password under 👥 Users.")
 
 # ============================================================================
 # STUDENT MANAGEMENT FUNCTIONS
@@ -228,7 +810,7 @@ def add_student():
         with col1:
             name = st.text_input("Student Name *")
             age = st.selectbox("Age *", AGE_OPTIONS)
-            blood_group = st.selectbox("Blood Group *", ["A+", "A-", "B+", "B-", "O+", "O-", "AB+", "AB-"])
+            blood_group = st.selectbox("Blood Group *", BLOOD_GROUPS)
         
         if st.session_state.device_mode != 'mobile':
             with col2:
@@ -269,6 +851,7 @@ def add_student():
                 }
                 students_df = pd.concat([students_df, pd.DataFrame([new_student])], ignore_index=True)
                 students_df.to_excel(STUDENT_FILE, index=False)
+                record_audit([audit_entry('student', new_student['Student_ID'], after=new_student)])
                 st.success(f"✅ Student {name} added successfully! ID: {new_student['Student_ID']}")
 
 def update_student():
@@ -293,16 +876,16 @@ def update_student():
         
         with col1:
             new_name = st.text_input("Student Name", value=student_data['Name'])
-            new_age = st.selectbox("Age", AGE_OPTIONS, index=AGE_OPTIONS.index(student_data['Age']))
-            new_blood = st.selectbox("Blood Group", ["A+", "A-", "B+", "B-", "O+", "O-", "AB+", "AB-"], index=["A+", "A-", "B+", "B-", "O+", "O-", "AB+", "AB-"].index(student_data['Blood_Group']))
+            new_age = st.selectbox("Age", AGE_OPTIONS, index=option_index(AGE_OPTIONS, student_data['Age']))
+            new_blood = st.selectbox("Blood Group", BLOOD_GROUPS, index=option_index(BLOOD_GROUPS, student_data['Blood_Group']))
         
         if col2:
             with col2:
-                new_standard = st.selectbox("Standard", STANDARDS, index=STANDARDS.index(student_data['Standard']))
+                new_standard = st.selectbox("Standard", STANDARDS, index=option_index(STANDARDS, student_data['Standard']))
                 new_father_phone = st.text_input("Father's Phone", value=str(student_data['Father_Phone']))
                 new_mother_phone = st.text_input("Mother's Phone", value=str(student_data['Mother_Phone']))
         else:
-            new_standard = st.selectbox("Standard", STANDARDS, index=STANDARDS.index(student_data['Standard']))
+            new_standard = st.selectbox("Standard", STANDARDS, index=option_index(STANDARDS, student_data['Standard']))
             new_father_phone = st.text_input("Father's Phone", value=str(student_data['Father_Phone']))
             new_mother_phone = st.text_input("Mother's Phone", value=str(student_data['Mother_Phone']))
         
@@ -319,6 +902,9 @@ def update_student():
             elif not validate_phone(new_mother_phone):
                 st.error("❌ Mother's phone must be 10 digits!")
             else:
+                # Excel hands phones and Aadhar back as numbers; allow the text values from the form
+                text_columns = ['Father_Phone', 'Mother_Phone', 'Aadhar_Details']
+                students_df[text_columns] = students_df[text_columns].astype(object)
                 students_df.loc[students_df['Name'] == selected_student, 'Name'] = new_name
                 students_df.loc[students_df['Name'] == new_name, 'Age'] = new_age
                 students_df.loc[students_df['Name'] == new_name, 'Blood_Group'] = new_blood
@@ -328,6 +914,8 @@ def update_student():
                 students_df.loc[students_df['Name'] == new_name, 'Mother_Phone'] = new_mother_phone
                 students_df.loc[students_df['Name'] == new_name, 'Aadhar_Details'] = new_aadhar
                 students_df.to_excel(STUDENT_FILE, index=False)
+                updated = students_df[students_df['Student_ID'] == student_data['Student_ID']].iloc[0]
+                record_audit([audit_entry('student', student_data['Student_ID'], student_data.to_dict(), updated.to_dict())])
                 st.success("✅ Student updated successfully!")
 
 def delete_student():
@@ -340,12 +928,13 @@ def delete_student():
     
     student_names = students_df['Name'].tolist()
     selected_student = st.selectbox("Select Student to Delete", student_names)
+    reason = st.selectbox("Reason", ["Graduated", "Left School", "Transferred", "Deleted"])
+    st.caption("The student is moved to the archive and can be restored from 🗄️ Archive.")
     
     col1, col2 = st.columns(2)
     with col1:
         if st.button("🗑️ Delete Student", type="secondary"):
-            students_df = students_df[students_df['Name'] != selected_student]
-            students_df.to_excel(STUDENT_FILE, index=False)
+            archive_students(students_df.loc[students_df['Name'] == selected_student, 'Student_ID'].tolist(), reason)
             st.success(f"✅ Student {selected_student} deleted successfully!")
 
 def import_students():
@@ -364,6 +953,7 @@ def import_students():
                 imported_df['Student_ID'] = range(get_next_student_id(), get_next_student_id() + len(imported_df))
                 students_df = pd.concat([students_df, imported_df], ignore_index=True)
                 students_df.to_excel(STUDENT_FILE, index=False)
+                record_audit([audit_entry('student', row['Student_ID'], after=row) for row in imported_df.to_dict('records')])
                 st.success(f"✅ {len(imported_df)} students imported successfully!")
         except Exception as e:
             st.error(f"❌ Error: {str(e)}")
@@ -397,7 +987,10 @@ def manage_fee_structure():
             existing = fee_df[(fee_df['Standard'] == standard) & (fee_df['Fee_Type'] == fee_type) & (fee_df['Academic_Year'] == academic_year)]
             
             if len(existing) > 0:
-                fee_df.loc[(fee_df['Standard'] == standard) & (fee_df['Fee_Type'] == fee_type), 'Amount'] = amount
+                mask = (fee_df['Standard'] == standard) & (fee_df['Fee_Type'] == fee_type)
+                before = fee_df[mask].to_dict('records')
+                fee_df.loc[mask, 'Amount'] = amount
+                entries = [audit_entry('fee_structure', old['Fee_ID'], old, new) for old, new in zip(before, fee_df[mask].to_dict('records'))]
                 st.success("✅ Fee structure updated!")
             else:
                 new_fee = {
@@ -408,9 +1001,11 @@ def manage_fee_structure():
                     'Academic_Year': academic_year
                 }
                 fee_df = pd.concat([fee_df, pd.DataFrame([new_fee])], ignore_index=True)
+                entries = [audit_entry('fee_structure', new_fee['Fee_ID'], after=new_fee)]
                 st.success("✅ Fee added!")
             
             fee_df.to_excel(FEE_STRUCTURE_FILE, index=False)
+            record_audit(entries)
     
     st.subheader("Current Fee Structure")
     if len(fee_df) > 0:
@@ -451,9 +1046,7 @@ def collect_payment():
         submitted = st.form_submit_button("💳 Record Payment")
         
         if submitted:
-            pay_df = initialize_fee_payments()
             new_payment = {
-                'Payment_ID': len(pay_df) + 1,
                 'Student_ID': student_id,
                 'Fee_Type': fee_type,
                 'Amount': amount,
@@ -461,9 +1054,26 @@ def collect_payment():
                 'Payment_Mode': payment_mode,
                 'Notes': notes
             }
-            pay_df = pd.concat([pay_df, pd.DataFrame([new_payment])], ignore_index=True)
-            pay_df.to_excel(FEE_PAYMENTS_FILE, index=False)
+            new_payment = save_payments([new_payment], [student_standard])[0]
+            issue_download('last_receipt', student_id, f"receipt_RCPT-{int(new_payment['Payment_ID']):06d}.pdf", render_receipt(new_payment, selected_student, student_standard))
             st.success("✅ Payment recorded successfully!")
+    
+    offer_download('last_receipt', student_id, "🧾 Download Receipt (PDF)", "application/pdf")
+
+def save_payments(payments, standards):
+    """Append payments in a single write, so a split family payment is recorded whole or not at all."""
+    pay_df = initialize_fee_payments()
+    first_id = get_next_payment_id(pay_df)
+    payments = [{'Payment_ID': first_id + offset, **payment} for offset, payment in enumerate(payments)]
+    pay_df = pd.concat([pay_df, pd.DataFrame(payments)], ignore_index=True)
+    buffer = BytesIO()
+    pay_df.to_excel(buffer, index=False)
+    with open(FEE_PAYMENTS_FILE + ".tmp", 'wb') as f:
+        f.write(buffer.getvalue())
+    os.replace(FEE_PAYMENTS_FILE + ".tmp", FEE_PAYMENTS_FILE)
+    record_audit([audit_entry('payment', payment['Payment_ID'], after=payment) for payment in payments])
+    add_payments_to_rollups(payments, standards)
+    return payments
 
 def view_payments():
     st.header("📋 View All Payments")
@@ -497,6 +1107,8 @@ def student_fee_history():
     selected_student = st.selectbox("Select Student", student_names)
     student_id = students_df[students_df['Name'] == selected_student]['Student_ID'].values[0]
     
+    if archived_years('payments') and st.checkbox("Include archived academic years"):
+        pay_df = pd.concat([read_archive('payments'), pay_df], ignore_index=True)
     student_payments = pay_df[pay_df['Student_ID'] == student_id]
     
     if len(student_payments) > 0:
@@ -572,80 +1184,1646 @@ def generate_reports():
                 st.info("No data for the selected date range.")
 
 # ============================================================================
-# MAIN APPLICATION
+# AUDIT LOG
 # ============================================================================
 
-def main():
-    check_url_params()
+# Every mutation is appended to audit_log/current.jsonl as a diff of the
+# changed fields. Once the active file reaches AUDIT_SEGMENT_BYTES it is
+# gzipped into a read-only segment; index.json lists each segment's time span
+# and the entities it touches, so a history lookup opens only the segments
+# that can contain matching records.
+
+AUDIT_ENTITIES = {"Student": "student", "Fee Structure": "fee_structure", "Payment": "payment", "User": "user", "Snapshot": "snapshot"}
+
+def _audit_value(value):
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+def audit_entry(entity, entity_id, before=None, after=None):
+    """Describe one mutation; pass before=None for a create and after=None for a delete."""
+    before = {field: _audit_value(value) for field, value in (before or {}).items()}
+    after = {field: _audit_value(value) for field, value in (after or {}).items()}
+    # Compare as text: Excel hands back phones and IDs as numbers, forms as strings
+    changes = {
+        field: [before.get(field), after.get(field)]
+        for field in {**before, **after}
+        if str(before.get(field)) != str(after.get(field))
+    }
+    if not before:
+        action = 'create'
+    elif not after:
+        action = 'delete'
+    else:
+        action = 'update'
+    return {
+        'ts': datetime.now().isoformat(timespec='seconds'),
+        'user': st.session_state.get('username', 'unknown'),
+        'entity': entity,
+        'id': str(_audit_value(entity_id)),
+        'action': action,
+        'changes': changes
+    }
+
+def _load_audit_index():
+    if not os.path.exists(AUDIT_INDEX_FILE):
+        return {'segments': []}
+    with open(AUDIT_INDEX_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+def _save_audit_index(index):
+    tmp_path = AUDIT_INDEX_FILE + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, AUDIT_INDEX_FILE)
+
+def _seal_audit_segment(index):
+    with open(AUDIT_CURRENT_FILE, encoding='utf-8') as f:
+        lines = f.readlines()
+    records = [json.loads(line) for line in lines]
+    name = f"segment_{len(index['segments']) + 1:06d}.jsonl.gz"
+    with gzip.open(os.path.join(AUDIT_DIR, name), 'wt', encoding='utf-8') as f:
+        f.writelines(lines)
+    index['segments'].append({
+        'file': name,
+        'start': records[0]['ts'],
+        'end': records[-1]['ts'],
+        'entities': sorted({f"{r['entity']}:{r['id']}" for r in records})
+    })
+    _save_audit_index(index)
+    os.remove(AUDIT_CURRENT_FILE)
+
+def record_audit(entries):
+    entries = [entry for entry in entries if entry['changes']]
+    if len(entries) == 0:
+        return
+    os.makedirs(AUDIT_DIR, exist_ok=True)
+    with open(AUDIT_CURRENT_FILE, 'a', encoding='utf-8') as f:
+        f.writelines(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n" for entry in entries)
+    if os.path.getsize(AUDIT_CURRENT_FILE) >= AUDIT_SEGMENT_BYTES:
+        _seal_audit_segment(_load_audit_index())
+
+def _read_audit_records(entity, entity_id, start, end):
+    key = f"{entity}:{entity_id}" if entity and entity_id else None
+    for segment in _load_audit_index()['segments']:
+        if (start and segment['end'] < start) or (end and segment['start'] > end):
+            continue
+        if key and key not in segment['entities']:
+            continue
+        with gzip.open(os.path.join(AUDIT_DIR, segment['file']), 'rt', encoding='utf-8') as f:
+            yield from (json.loads(line) for line in f)
+    if os.path.exists(AUDIT_CURRENT_FILE):
+        with open(AUDIT_CURRENT_FILE, encoding='utf-8') as f:
+            yield from (json.loads(line) for line in f)
+
+def audit_history(entity=None, entity_id=None, start=None, end=None):
+    """One row per changed field, newest first. start/end are ISO timestamps (inclusive)."""
+    entity_id = str(entity_id) if entity_id else None
+    rows = []
+    for record in _read_audit_records(entity, entity_id, start, end):
+        if entity and record['entity'] != entity:
+            continue
+        if entity_id and record['id'] != entity_id:
+            continue
+        if (start and record['ts'] < start) or (end and record['ts'] > end):
+            continue
+        for field, (before, after) in record['changes'].items():
+            rows.append({
+                'Timestamp': record['ts'],
+                'User': record['user'],
+                'Entity': record['entity'],
+                'Entity_ID': record['id'],
+                'Action': record['action'],
+                'Field': field,
+                'Before': before,
+                'After': after
+            })
+    history = pd.DataFrame(rows, columns=['Timestamp', 'User', 'Entity', 'Entity_ID', 'Action', 'Field', 'Before', 'After'])
+    return history.sort_values('Timestamp', ascending=False, kind='stable')
+
+def audit_log_page():
+    st.header("🕓 Audit Log")
     
-    if not st.session_state.logged_in:
-        login_page()
+    col1, col2 = st.columns(2)
+    with col1:
+        entity_label = st.selectbox("Entity", ["All"] + list(AUDIT_ENTITIES))
+        entity_id = st.text_input("Entity ID (optional)")
+    with col2:
+        start_date = st.date_input("From", value=datetime.now().date().replace(day=1))
+        end_date = st.date_input("To", value=datetime.now().date())
+    
+    history = audit_history(
+        AUDIT_ENTITIES.get(entity_label),
+        entity_id.strip(),
+        start_date.isoformat(),
+        f"{end_date.isoformat()}T23:59:59"
+    )
+    
+    if len(history) > 0:
+        st.dataframe(history.fillna("").astype(str), use_container_width=True, hide_index=True)
+        
+        csv = history.to_csv(index=False)
+        st.download_button(
+            label="📥 Download Audit Log (CSV)",
+            data=csv,
+            file_name=f"audit_{start_date}_{end_date}.csv",
+            mime="text/csv"
+        )
+    else:
+        st.info("No changes recorded for the selected filters.")
+
+# ============================================================================
+# COLLECTIONS DASHBOARD
+# ============================================================================
+
+# The dashboard reads daily rollups (Date x Standard) instead of the raw
+# payments. save_payments adds each new payment to the rollups directly;
+# payments written any other way are picked up by Payment_ID watermark the
+# next time the payments file version no longer matches the rollup's.
+
+def file_version(path):
+    """Cheap change token for a data file: (mtime_ns, size), or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _rollup_rows(pay_df):
+    return (
+        pay_df.assign(
+            Date=pd.to_datetime(pay_df['Payment_Date']).dt.normalize(),
+            Standard=pay_df['Standard'].fillna("Unknown"),
+            Payments=1
+        )
+        .groupby(['Date', 'Standard'], as_index=False)[['Amount', 'Payments']]
+        .sum()
+    )
+
+def _merge_rollups(daily, new_rows):
+    if len(daily) == 0:
+        return new_rows
+    return pd.concat([daily, new_rows], ignore_index=True).groupby(['Date', 'Standard'], as_index=False)[['Amount', 'Payments']].sum()
+
+def save_rollups(daily, last_payment_id):
+    # Stored as text: nanosecond mtimes do not survive Excel's float cells
+    meta = pd.DataFrame([{
+        'Last_Payment_ID': last_payment_id,
+        'Payments_Version': str(file_version(FEE_PAYMENTS_FILE))
+    }])
+    with pd.ExcelWriter(ROLLUP_FILE) as writer:
+        daily.to_excel(writer, sheet_name='Daily', index=False)
+        meta.to_excel(writer, sheet_name='Meta', index=False)
+
+# One entry per cached file: each write makes a new version key, and the old
+# copy would otherwise stay in memory for the life of the server
+@st.cache_data(show_spinner=False, max_entries=1)
+def _read_rollups(version):
+    sheets = pd.read_excel(ROLLUP_FILE, sheet_name=None)
+    return sheets['Daily'], sheets['Meta'].iloc[0].to_dict()
+
+def load_rollups():
+    """Return up-to-date daily rollups, catching up on payments newer than the watermark if needed."""
+    if file_version(ROLLUP_FILE) is not None:
+        daily, meta = _read_rollups(file_version(ROLLUP_FILE))
+        if meta['Payments_Version'] == str(file_version(FEE_PAYMENTS_FILE)):
+            return daily
+        last_payment_id = meta['Last_Payment_ID']
+    else:
+        # Rebuilt from scratch (first run, or after a restore): closed years
+        # live only in the archive, so fold those in, then every live row.
+        # Archived and live IDs never overlap, but a backdated payment for a
+        # closed year can sit below newer live IDs, so no watermark applies yet
+        daily = pd.DataFrame(columns=['Date', 'Standard', 'Amount', 'Payments'])
+        last_payment_id = 0
+        archived = read_archive('payments')
+        if len(archived) > 0:
+            daily = _merge_rollups(daily, _rollup_rows(_with_standard(archived)))
+    
+    pay_df = initialize_fee_payments()
+    new_payments = pay_df[pay_df['Payment_ID'] > last_payment_id]
+    if len(new_payments) > 0:
+        daily = _merge_rollups(daily, _rollup_rows(_with_standard(new_payments)))
+    # Never lower the watermark: while a year is closed its IDs are missing from
+    # the payments file, and reopening it must not count them a second time
+    last_payment_id = max(int(last_payment_id), int(pay_df['Payment_ID'].max()) if len(pay_df) > 0 else 0, archived_max_id('payments'))
+    save_rollups(daily, last_payment_id)
+    return daily
+
+def _with_standard(payments):
+    students_df = pd.concat([initialize_student_excel(), read_archive('students')], ignore_index=True)
+    standards = students_df.drop_duplicates('Student_ID', keep='first')[['Student_ID', 'Standard']]
+    return payments.merge(standards, on='Student_ID', how='left')
+
+def add_payments_to_rollups(payments, standards):
+    """Fold just-written payments into the rollups without re-reading the payments file."""
+    if file_version(ROLLUP_FILE) is None:
+        return
+    daily, meta = _read_rollups(file_version(ROLLUP_FILE))
+    if meta['Last_Payment_ID'] != payments[0]['Payment_ID'] - 1:
+        # Rollups are behind; load_rollups() will catch up from the watermark
         return
+    new_rows = _rollup_rows(pd.DataFrame([{**payment, 'Standard': standard} for payment, standard in zip(payments, standards)]))
+    save_rollups(_merge_rollups(daily, new_rows), int(payments[-1]['Payment_ID']))
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _class_strength(version):
+    return initialize_student_excel()['Standard'].value_counts()
+
+# A few academic years may be viewed side by side
+@st.cache_data(show_spinner=False, max_entries=4)
+def _fees_due_per_student(version, academic_year):
+    fee_df = initialize_fee_structure()
+    return fee_df[fee_df['Academic_Year'] == academic_year].groupby('Standard')['Amount'].sum()
+
+def term_bounds(day):
+    """Terms run April-September and October-March, matching an April-March academic year."""
+    if day.month >= 10:
+        return date(day.year, 10, 1), date(day.year + 1, 3, 31)
+    elif day.month >= 4:
+        return date(day.year, 4, 1), date(day.year, 9, 30)
+    else:
+        return date(day.year - 1, 10, 1), date(day.year, 3, 31)
+
+def academic_year_label(day):
+    start_year = day.year if day.month >= 4 else day.year - 1
+    return f"{start_year}-{start_year + 1}"
+
+def academic_year_bounds(academic_year):
+    match = re.match(r'^(\d{4})', str(academic_year))
+    if not match:
+        return None
+    start_year = int(match.group(1))
+    return date(start_year, 4, 1), date(start_year + 1, 3, 31)
+
+def _collection_series(daily, start_date, end_date, rule):
+    series = daily.groupby('Date')['Amount'].sum()
+    days = pd.date_range(start_date, end_date)
+    return series.reindex(days, fill_value=0).resample(rule).sum()
+
+def _collections_between(daily, start_date, end_date):
+    return daily[(daily['Date'] >= pd.Timestamp(start_date)) & (daily['Date'] <= pd.Timestamp(end_date))]
+
+def collections_dashboard():
+    st.header("📊 Collections Dashboard")
     
-    # Initialize device_mode if not already set
-    if 'device_mode' not in st.session_state:
-        st.session_state.device_mode = 'desktop'
+    daily = load_rollups()
+    if len(daily) == 0:
+        st.info("No payments recorded yet.")
+        return
+    daily['Date'] = pd.to_datetime(daily['Date'])
     
-    # Dark Theme Styling - BLACK BACKGROUND
-    st.markdown("""
-        <style>
-        /* Main background - BLACK */
-        .main {
-            background-color: #1a1a1a !important;
-        }
+    col1, col2 = st.columns(2)
+    with col1:
+        granularity = st.selectbox("Granularity", ["Daily", "Weekly", "Monthly"])
+    with col2:
+        day = st.date_input("Term Containing", value=datetime.now().date())
+    rule = {"Daily": "D", "Weekly": "W", "Monthly": "MS"}[granularity]
+    
+    term_start, term_end = term_bounds(day)
+    prev_start, prev_end = term_bounds(term_start - timedelta(days=1))
+    current = _collections_between(daily, term_start, term_end)
+    previous = _collections_between(daily, prev_start, prev_end)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("This Term", f"₹{current['Amount'].sum():,.2f}", delta=f"₹{current['Amount'].sum() - previous['Amount'].sum():,.2f}")
+    with col2:
+        st.metric("Previous Term", f"₹{previous['Amount'].sum():,.2f}")
+    with col3:
+        st.metric("Payments This Term", int(current['Payments'].sum()), delta=int(current['Payments'].sum() - previous['Payments'].sum()))
+    
+    st.subheader(f"{granularity} Collections ({term_start.strftime('%b %Y')} - {term_end.strftime('%b %Y')})")
+    st.line_chart(_collection_series(daily, term_start, term_end, rule))
+    
+    st.subheader("Compared With Previous Term")
+    comparison = pd.DataFrame({
+        'This Term': _collection_series(daily, term_start, term_end, rule).reset_index(drop=True),
+        'Previous Term': _collection_series(daily, prev_start, prev_end, rule).reset_index(drop=True)
+    })
+    comparison.index = comparison.index + 1
+    comparison.index.name = {"Daily": "Day", "Weekly": "Week", "Monthly": "Month"}[granularity] + " of Term"
+    st.line_chart(comparison)
+    
+    by_standard = pd.DataFrame({
+        'This Term': current.groupby('Standard')['Amount'].sum(),
+        'Previous Term': previous.groupby('Standard')['Amount'].sum()
+    }).fillna(0)
+    st.bar_chart(by_standard)
+    
+    st.subheader("Collection Rate per Standard")
+    fee_years = initialize_fee_structure()['Academic_Year'].dropna().unique().tolist()
+    if len(fee_years) == 0:
+        st.info("Define a fee structure to see collection rates.")
+        return
+    academic_year = st.selectbox("Academic Year", sorted(fee_years, reverse=True))
+    bounds = academic_year_bounds(academic_year)
+    if bounds is None:
+        st.warning(f"Cannot read the start year from '{academic_year}'.")
+        return
+    
+    rate = pd.DataFrame({
+        'Students': _class_strength(file_version(STUDENT_FILE)),
+        'Fees_Per_Student': _fees_due_per_student(file_version(FEE_STRUCTURE_FILE), academic_year),
+        'Collected': _collections_between(daily, *bounds).groupby('Standard')['Amount'].sum()
+    }).reindex(STANDARDS).fillna(0)
+    rate['Expected'] = rate['Students'] * rate['Fees_Per_Student']
+    rate['Collection_%'] = (100 * rate['Collected'] / rate['Expected'].where(rate['Expected'] > 0)).round(1)
+    st.dataframe(rate, use_container_width=True)
+
+# ============================================================================
+# FAMILIES
+# ============================================================================
+
+# Siblings are linked through the parent phones on their student rows: any two
+# students sharing a Father_Phone or Mother_Phone belong to the same family.
+# The index maps a hashed, normalized phone to a family id (the lowest
+# Student_ID in it), so a number typed at the counter resolves with one dict
+# lookup. It is rebuilt only when the students file changes.
+
+def normalize_phone(value):
+    """Last 10 digits of a phone as typed or as Excel hands it back (9876543210.0, +91 98765-43210)."""
+    text = str(value)
+    if text.endswith('.0'):
+        text = text[:-2]
+    digits = re.sub(r'\D', '', text)
+    return digits[-10:] if len(digits) >= 10 else None
+
+def phone_key(value):
+    phone = normalize_phone(value)
+    return hashlib.blake2b(phone.encode(), digest_size=8).hexdigest() if phone else None
+
+# cache_resource hands back the same dicts instead of a copy, keeping lookups O(1)
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _family_index(version):
+    students_df = initialize_student_excel()
+    parent = {}
+    
+    def root(student_id):
+        while parent[student_id] != student_id:
+            parent[student_id] = parent[parent[student_id]]
+            student_id = parent[student_id]
+        return student_id
+    
+    owner = {}
+    for student_id, father, mother in zip(students_df['Student_ID'], students_df['Father_Phone'], students_df['Mother_Phone']):
+        student_id = int(student_id)
+        parent.setdefault(student_id, student_id)
+        for key in {phone_key(father), phone_key(mother)} - {None}:
+            if key not in owner:
+                owner[key] = student_id
+                continue
+            a, b = root(owner[key]), root(student_id)
+            parent[max(a, b)] = min(a, b)
+    
+    families = {}
+    for student_id in sorted(parent):
+        families.setdefault(root(student_id), []).append(student_id)
+    return {key: root(student_id) for key, student_id in owner.items()}, families
+
+def family_index():
+    """(phone key -> family id, family id -> sorted Student_IDs) for the current students file."""
+    return _family_index(file_version(STUDENT_FILE))
+
+def find_family(phone):
+    phones, families = family_index()
+    return families.get(phones.get(phone_key(phone)), [])
+
+def family_dues(student_ids, academic_year):
+    """Fees due, paid and outstanding for each sibling in an academic year."""
+    members = initialize_student_excel()
+    members = members[members['Student_ID'].isin(student_ids)][['Student_ID', 'Name', 'Standard']].copy()
+    pay_df = initialize_fee_payments()
+    pay_df = pay_df[pay_df['Student_ID'].isin(student_ids)]
+    start_date, end_date = academic_year_bounds(academic_year)
+    paid_on = pd.to_datetime(pay_df['Payment_Date'])
+    in_year = pay_df[(paid_on >= pd.Timestamp(start_date)) & (paid_on <= pd.Timestamp(end_date))]
+    
+    fees_due = _fees_due_per_student(file_version(FEE_STRUCTURE_FILE), academic_year)
+    members['Fees_Due'] = members['Standard'].map(fees_due).fillna(0).astype(float)
+    members['Paid'] = members['Student_ID'].map(in_year.groupby('Student_ID')['Amount'].sum()).fillna(0).astype(float)
+    members['Outstanding'] = (members['Fees_Due'] - members['Paid']).clip(lower=0)
+    return members.reset_index(drop=True)
+
+def family_fees():
+    st.header("👨‍👩‍👧 Family Fees")
+    
+    phone = st.text_input("Parent Phone", max_chars=16, placeholder="Father's or mother's number")
+    if not phone:
+        st.info("Enter a parent's phone number to see all their children together.")
+        return
+    if normalize_phone(phone) is None:
+        st.error("Enter a 10 digit phone number.")
+        return
+    
+    sibling_ids = find_family(phone)
+    if len(sibling_ids) == 0:
+        st.warning("No student is registered with this phone number.")
+        return
+    
+    fee_years = initialize_fee_structure()['Academic_Year'].dropna().unique().tolist()
+    academic_year = st.selectbox("Academic Year", sorted(fee_years, reverse=True) or [academic_year_label(datetime.now().date())])
+    if academic_year_bounds(academic_year) is None:
+        st.warning(f"Cannot read the start year from '{academic_year}'.")
+        return
+    
+    dues = family_dues(sibling_ids, academic_year)
+    st.dataframe(dues, use_container_width=True, hide_index=True)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Family Fees Due", f"₹{dues['Fees_Due'].sum():,.2f}")
+    with col2:
+        st.metric("Paid", f"₹{dues['Paid'].sum():,.2f}")
+    with col3:
+        st.metric("Outstanding", f"₹{dues['Outstanding'].sum():,.2f}")
+    
+    fee_df = initialize_fee_structure()
+    available_fees = fee_df[fee_df['Standard'].isin(dues['Standard'])]['Fee_Type'].unique().tolist()
+    
+    st.subheader("Collect One Payment for the Family")
+    with st.form("family_payment_form"):
+        col1, col2 = st.columns(2)
         
-        /* App container - BLACK */
-        [data-testid="stAppViewContainer"] {
-            background-color: #1a1a1a !important;
-            color: #ffffff !important;
-        }
+        with col1:
+            fee_type = st.selectbox("Fee Type", available_fees if available_fees else FEE_TYPES)
+            payment_date = st.date_input("Payment Date")
         
-        /* Headers - WHITE TEXT */
-        h1, h2, h3, h4, h5, h6 {
-            color: #ffffff !important;
-        }
+        with col2:
+            payment_mode = st.selectbox("Payment Mode", PAYMENT_MODES)
+            notes = st.text_input("Notes")
         
-        /* Text - WHITE */
-        p, span, label {
-            color: #ffffff !important;
-        }
+        st.markdown("**Split** (defaults to each child's outstanding balance)")
+        shares = {}
+        for member in dues.to_dict('records'):
+            shares[member['Student_ID']] = st.number_input(
+                f"{member['Name']} ({member['Standard']})",
+                min_value=0.0,
+                value=float(member['Outstanding']),
+                key=f"family_share_{member['Student_ID']}"
+            )
         
-        /* Input fields - DARK BACKGROUND */
-        input, textarea, select {
-            background-color: #2a2a2a !important;
-            color: #ffffff !important;
-            border-color: #444444 !important;
-        }
+        submitted = st.form_submit_button("💳 Record Family Payment")
         
-        /* Dataframe - DARK */
-        [data-testid="stDataFrame"] {
-            background-color: #2a2a2a !important;
-        }
+        if submitted:
+            members = [member for member in dues.to_dict('records') if shares[member['Student_ID']] > 0]
+            if len(members) == 0:
+                st.error("Enter an amount for at least one child.")
+            else:
+                family_note = "Family payment" + (f" - {notes}" if notes else "")
+                payments = save_payments(
+                    [{
+                        'Student_ID': member['Student_ID'],
+                        'Fee_Type': fee_type,
+                        'Amount': shares[member['Student_ID']],
+                        'Payment_Date': payment_date,
+                        'Payment_Mode': payment_mode,
+                        'Notes': family_note
+                    } for member in members],
+                    [member['Standard'] for member in members]
+                )
+                issue_download(
+                    'last_family_receipts',
+                    sibling_ids[0],
+                    f"family_receipts_RCPT-{int(payments[0]['Payment_ID']):06d}.zip",
+                    render_zip([
+                        (f"receipt_RCPT-{int(payment['Payment_ID']):06d}.pdf", render_receipt, (payment, member['Name'], member['Standard']))
+                        for payment, member in zip(payments, members)
+                    ])
+                )
+                st.success(f"✅ Recorded ₹{sum(p['Amount'] for p in payments):,.2f} across {len(payments)} children!")
+    
+    offer_download('last_family_receipts', sibling_ids[0], "🧾 Download Receipts (ZIP)", "application/zip")
+
+# ============================================================================
+# ARCHIVE
+# ============================================================================
+
+# Students who leave and payments from closed academic years move out of the
+# working workbooks into gzipped CSV partitions under archive/, one per kind
+# and academic year (e.g. payments_2023-2024.csv.gz). Partitions are kept
+# read-only and are only rewritten by archive/restore. archive/index.json
+# records row counts and the highest ID per partition so new IDs never reuse
+# an archived one.
+
+ARCHIVE_KINDS = {'students': 'Student_ID', 'payments': 'Payment_ID'}
+# Academic years of partitions kept in memory per kind
+ARCHIVE_MAX_PARTITIONS = 16
+
+def _archive_path(kind, academic_year):
+    return os.path.join(ARCHIVE_DIR, f"{kind}_{academic_year}.csv.gz")
+
+def _load_archive_index():
+    if not os.path.exists(ARCHIVE_INDEX_FILE):
+        return {}
+    with open(ARCHIVE_INDEX_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+def _save_archive_index(index):
+    tmp_path = ARCHIVE_INDEX_FILE + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_path, ARCHIVE_INDEX_FILE)
+
+def archived_years(kind):
+    return sorted(key.split('_', 1)[1] for key in _load_archive_index() if key.startswith(f"{kind}_"))
+
+def archived_max_id(kind):
+    index = _load_archive_index()
+    return max((entry['max_id'] for key, entry in index.items() if key.startswith(f"{kind}_")), default=0)
+
+# read_archive loads every partition of a kind at once, so keep room for
+# all of them; stale versions are evicted as partitions are rewritten
+@st.cache_data(show_spinner=False, max_entries=2 * ARCHIVE_MAX_PARTITIONS)
+def _read_partition(path, version):
+    return pd.read_csv(path, compression='gzip')
+
+def read_archive(kind, academic_year=None):
+    """Archived rows of one kind, from a single academic year or all of them."""
+    years = [academic_year] if academic_year else archived_years(kind)
+    frames = [_read_partition(path, file_version(path)) for path in map(lambda y: _archive_path(kind, y), years) if os.path.exists(path)]
+    if len(frames) == 0:
+        return pd.DataFrame()
+    archived = pd.concat(frames, ignore_index=True)
+    if kind == 'payments':
+        archived['Payment_Date'] = pd.to_datetime(archived['Payment_Date'])
+    return archived
+
+def _write_partition(kind, academic_year, df):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = _archive_path(kind, academic_year)
+    index = _load_archive_index()
+    key = f"{kind}_{academic_year}"
+    if len(df) == 0:
+        if os.path.exists(path):
+            os.chmod(path, 0o644)
+            os.remove(path)
+        index.pop(key, None)
+    else:
+        tmp_path = path + ".tmp"
+        df.to_csv(tmp_path, index=False, compression='gzip')
+        os.chmod(tmp_path, 0o444)
+        if os.path.exists(path):
+            os.chmod(path, 0o644)
+        os.replace(tmp_path, path)
+        index[key] = {'rows': len(df), 'max_id': int(df[ARCHIVE_KINDS[kind]].max())}
+    _save_archive_index(index)
+
+def archive_students(student_ids, reason):
+    students_df = initialize_student_excel()
+    leaving = students_df['Student_ID'].isin(student_ids)
+    if not leaving.any():
+        return 0
+    academic_year = academic_year_label(datetime.now().date())
+    archived = students_df[leaving].assign(Archived_On=datetime.now().strftime('%Y-%m-%d'), Archive_Reason=reason)
+    _write_partition('students', academic_year, pd.concat([read_archive('students', academic_year), archived], ignore_index=True))
+    students_df[~leaving].to_excel(STUDENT_FILE, index=False)
+    record_audit([
+        audit_entry('student', sid, {'Status': 'Active'}, {'Status': 'Archived', 'Archive_Reason': reason})
+        for sid in archived['Student_ID']
+    ])
+    return len(archived)
+
+def restore_students(student_ids):
+    restored = []
+    for academic_year in archived_years('students'):
+        partition = read_archive('students', academic_year)
+        returning = partition['Student_ID'].isin(student_ids)
+        if returning.any():
+            restored.append(partition[returning].drop(columns=['Archived_On', 'Archive_Reason']))
+            _write_partition('students', academic_year, partition[~returning])
+    if len(restored) == 0:
+        return 0
+    restored = pd.concat(restored, ignore_index=True)
+    students_df = pd.concat([initialize_student_excel(), restored], ignore_index=True)
+    students_df.to_excel(STUDENT_FILE, index=False)
+    record_audit([audit_entry('student', sid, {'Status': 'Archived'}, {'Status': 'Active'}) for sid in restored['Student_ID']])
+    return len(restored)
+
+def _payment_years(pay_df):
+    """Academic year label per payment; missing or unreadable dates (flagged by the integrity scan) get none."""
+    dates = pd.to_datetime(pay_df['Payment_Date'], errors='coerce')
+    start_year = dates.dt.year.astype('Int64') - (dates.dt.month < 4).astype('Int64')
+    labels = start_year.astype(str) + "-" + (start_year + 1).astype(str)
+    return labels.where(start_year.notna())
+
+def close_academic_year(academic_year):
+    """Move a finished academic year's payments into its archive partition."""
+    pay_df = initialize_fee_payments()
+    closing = (_payment_years(pay_df) == academic_year).to_numpy()
+    if not closing.any():
+        return 0
+    _write_partition('payments', academic_year, pd.concat([read_archive('payments', academic_year), pay_df[closing]], ignore_index=True))
+    pay_df[~closing].to_excel(FEE_PAYMENTS_FILE, index=False)
+    record_audit([audit_entry('payment', pid, {'Status': 'Active'}, {'Status': 'Archived'}) for pid in pay_df.loc[closing, 'Payment_ID']])
+    return int(closing.sum())
+
+def reopen_academic_year(academic_year):
+    archived = read_archive('payments', academic_year)
+    if len(archived) == 0:
+        return 0
+    pay_df = pd.concat([initialize_fee_payments(), archived], ignore_index=True).sort_values('Payment_ID')
+    pay_df.to_excel(FEE_PAYMENTS_FILE, index=False)
+    _write_partition('payments', academic_year, archived.iloc[0:0])
+    record_audit([audit_entry('payment', pid, {'Status': 'Archived'}, {'Status': 'Active'}) for pid in archived['Payment_ID']])
+    return len(archived)
+
+def archive_page():
+    st.header("🗄️ Archive")
+    
+    # Closing or reopening a year moves payment rows, so it needs fee access
+    if "💰 Fees Management" in ROLES[st.session_state.role]:
+        tab1, tab2 = st.tabs(["👨‍🎓 Archived Students", "📅 Academic Years"])
+    else:
+        tab1, tab2 = st.tabs(["👨‍🎓 Archived Students"])[0], None
+    
+    with tab1:
+        archived = read_archive('students')
+        if len(archived) == 0:
+            st.info("No archived students.")
+        else:
+            search = st.text_input("Search by Name")
+            if search:
+                archived = archived[archived['Name'].str.contains(search, case=False, na=False)]
+            st.dataframe(archived, use_container_width=True, hide_index=True)
+            
+            names = dict(zip(archived['Student_ID'], archived['Name']))
+            to_restore = st.multiselect("Students to Restore", list(names), format_func=lambda sid: f"{sid} - {names[sid]}")
+            if st.button("♻️ Restore Selected") and to_restore:
+                count = restore_students(to_restore)
+                st.success(f"✅ {count} student(s) restored!")
+    
+    if tab2 is None:
+        return
+    
+    with tab2:
+        st.subheader("Close Academic Year")
+        pay_df = initialize_fee_payments()
+        current_year = academic_year_label(datetime.now().date())
+        closable = sorted(year for year in _payment_years(pay_df).dropna().unique() if year < current_year) if len(pay_df) > 0 else []
+        if len(closable) == 0:
+            st.info("No finished academic years with payments to archive.")
+        else:
+            year = st.selectbox("Academic Year to Close", closable)
+            if st.button("📦 Archive Payments"):
+                count = close_academic_year(year)
+                st.success(f"✅ Archived {count} payments from {year}")
         
-        /* Info/Success/Error boxes */
-        [data-testid="stAlert"] {
-            background-color: #2a2a2a !important;
-            color: #ffffff !important;
+        st.subheader("Archived Payments")
+        years = archived_years('payments')
+        if len(years) == 0:
+            st.info("No archived academic years.")
+        else:
+            year = st.selectbox("Archived Year", years, index=len(years) - 1)
+            st.dataframe(read_archive('payments', year), use_container_width=True, hide_index=True)
+            if st.button("♻️ Reopen Year"):
+                count = reopen_academic_year(year)
+                st.success(f"✅ Restored {count} payments from {year}")
+
+# ============================================================================
+# BACKUPS
+# ============================================================================
+
+# Snapshots are content-addressed. Each data file is cut into chunks at
+# record boundaries (sheet rows and shared strings in .xlsx members, lines in
+# .jsonl), with a chunk ending after any record whose CRC matches
+# BACKUP_CHUNK_MASK, so an added or edited row only changes the chunks around
+# it; a record longer than BACKUP_MAX_CHUNK is cut at fixed offsets. Chunks are stored
+# once under backups/objects/<sha256> (zlib-compressed) and each snapshot is
+# a small JSON manifest listing the chunks of every file. Zip-based files
+# (.xlsx, .npz) are chunked per member on their uncompressed content.
+#
+# Files are read without locking: a read is retried if a file's version
+# changes while it is being copied or if it is a half-written zip.
+#
+# Retention: every snapshot from the last BACKUP_KEEP_DAYS days is kept, then
+# the newest one of each of BACKUP_KEEP_MONTHS earlier months. Chunks no kept
+# snapshot refers to are deleted after each snapshot.
+
+def backup_paths():
+    paths = [p for p in (STUDENT_FILE, FEE_STRUCTURE_FILE, FEE_PAYMENTS_FILE, ATTENDANCE_FILE, USERS_FILE) if os.path.exists(p)]
+    for directory in (AUDIT_DIR, ARCHIVE_DIR):
+        for root, _, files in os.walk(directory):
+            paths += [os.path.join(root, f) for f in files if not f.endswith('.tmp')]
+    return sorted(p.replace(os.sep, '/') for p in paths)
+
+def _is_complete(data):
+    if not data.startswith(b"PK"):
+        return True
+    try:
+        with zipfile.ZipFile(BytesIO(data)) as zf:
+            return zf.testzip() is None
+    except zipfile.BadZipFile:
+        return False
+
+def _read_consistent(paths, attempts=5):
+    """Read every file so that none changed while the set was being read."""
+    for _ in range(attempts):
+        before = {path: file_version(path) for path in paths}
+        contents = {}
+        for path in paths:
+            try:
+                with open(path, 'rb') as f:
+                    contents[path] = f.read()
+            except FileNotFoundError:
+                pass
+        if all(file_version(path) == before[path] for path in paths) and all(map(_is_complete, contents.values())):
+            return contents
+        time.sleep(0.2)
+    raise RuntimeError("Data files kept changing during the backup. Please try again.")
+
+RECORD_END = re.compile(rb'</row>|</si>|\n')
+
+def _records(data):
+    start = 0
+    for match in RECORD_END.finditer(data):
+        yield data[start:match.end()]
+        start = match.end()
+    if start < len(data):
+        yield data[start:]
+
+def _split_chunks(data):
+    chunks, current, size = [], [], 0
+    for record in _records(data):
+        # openpyxl can write a whole part on one line; never let one record outgrow a chunk
+        while size + len(record) > BACKUP_MAX_CHUNK:
+            cut = BACKUP_MAX_CHUNK - size
+            chunks.append(b"".join(current) + record[:cut])
+            record, current, size = record[cut:], [], 0
+        current.append(record)
+        size += len(record)
+        if zlib.crc32(record) & BACKUP_CHUNK_MASK == 0 or size >= BACKUP_MAX_CHUNK:
+            chunks.append(b"".join(current))
+            current, size = [], 0
+    if current:
+        chunks.append(b"".join(current))
+    return chunks
+
+def _object_path(digest):
+    return os.path.join(BACKUP_OBJECTS_DIR, digest[:2], digest)
+
+def _store_chunks(data, stats):
+    digests = []
+    for chunk in _split_chunks(data):
+        digest = hashlib.sha256(chunk).hexdigest()
+        path = _object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            compressed = zlib.compress(chunk)
+            # A unique temp name per writer, so two snapshots storing the same
+            # chunk never publish each other's half-written file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            stats['stored_bytes'] += len(compressed)
+        digests.append(digest)
+    return digests
+
+def _load_chunks(digests):
+    parts = []
+    for digest in digests:
+        with open(_object_path(digest), 'rb') as f:
+            parts.append(zlib.decompress(f.read()))
+    return b"".join(parts)
+
+def _zip_members(data):
+    with zipfile.ZipFile(BytesIO(data)) as zf:
+        return [(info.filename, zf.read(info)) for info in zf.infolist()]
+
+def content_hash(data):
+    """Hash of a file's content; for zip files, of the uncompressed members."""
+    if not data.startswith(b"PK"):
+        return hashlib.sha256(data).hexdigest()
+    digest = hashlib.sha256()
+    for name, member in _zip_members(data):
+        digest.update(name.encode() + b"\0" + member)
+    return digest.hexdigest()
+
+def take_snapshot(label=""):
+    with _backup_scheduler()['lock']:
+        return _take_snapshot(label)
+
+def _take_snapshot(label):
+    # Callers hold _backup_scheduler()['lock']
+    created = datetime.now()
+    snapshot_id = created.strftime('%Y%m%dT%H%M%S')
+    suffix = 1
+    while os.path.exists(os.path.join(BACKUP_SNAPSHOTS_DIR, f"{snapshot_id}.json")):
+        snapshot_id = f"{created.strftime('%Y%m%dT%H%M%S')}-{suffix}"
+        suffix += 1
+    stats = {'stored_bytes': 0, 'logical_bytes': 0}
+    files = {}
+    for path, data in _read_consistent(backup_paths()).items():
+        stats['logical_bytes'] += len(data)
+        if data.startswith(b"PK"):
+            members = [{'name': name, 'chunks': _store_chunks(member, stats)} for name, member in _zip_members(data)]
+            files[path] = {'type': 'zip', 'members': members, 'sha256': content_hash(data)}
+        else:
+            files[path] = {'type': 'raw', 'chunks': _store_chunks(data, stats), 'sha256': content_hash(data)}
+    manifest = {'id': snapshot_id, 'created': created.isoformat(timespec='seconds'), 'label': label, 'files': files, **stats}
+    os.makedirs(BACKUP_SNAPSHOTS_DIR, exist_ok=True)
+    with open(os.path.join(BACKUP_SNAPSHOTS_DIR, f"{snapshot_id}.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    prune_snapshots(created)
+    return manifest
+
+def _manifest_chunks(manifest):
+    for entry in manifest['files'].values():
+        for part in entry['members'] if entry['type'] == 'zip' else [entry]:
+            yield from part['chunks']
+
+def prune_snapshots(now):
+    """Apply the retention policy and delete chunks left unreferenced; returns the snapshots removed."""
+    # Callers hold _backup_scheduler()['lock']
+    snapshots = list_snapshots()
+    keep, months = set(snapshots[-1:]), set()
+    for snapshot_id in reversed(snapshots):
+        created = datetime.strptime(snapshot_id[:15], '%Y%m%dT%H%M%S')
+        if now - created <= timedelta(days=BACKUP_KEEP_DAYS):
+            keep.add(snapshot_id)
+        elif (created.year, created.month) not in months and len(months) < BACKUP_KEEP_MONTHS:
+            months.add((created.year, created.month))
+            keep.add(snapshot_id)
+    removed = [snapshot_id for snapshot_id in snapshots if snapshot_id not in keep]
+    if len(removed) == 0:
+        return []
+    for snapshot_id in removed:
+        os.remove(os.path.join(BACKUP_SNAPSHOTS_DIR, f"{snapshot_id}.json"))
+    referenced = {digest for snapshot_id in keep for digest in _manifest_chunks(load_snapshot(snapshot_id))}
+    for root, _, files in os.walk(BACKUP_OBJECTS_DIR):
+        for name in files:
+            if name not in referenced:
+                os.remove(os.path.join(root, name))
+    return removed
+
+def list_snapshots():
+    if not os.path.exists(BACKUP_SNAPSHOTS_DIR):
+        return []
+    return sorted(name[:-5] for name in os.listdir(BACKUP_SNAPSHOTS_DIR) if name.endswith('.json'))
+
+def load_snapshot(snapshot_id):
+    with open(os.path.join(BACKUP_SNAPSHOTS_DIR, f"{snapshot_id}.json"), encoding='utf-8') as f:
+        return json.load(f)
+
+def _rebuild_file(entry):
+    if entry['type'] == 'raw':
+        return _load_chunks(entry['chunks'])
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for member in entry['members']:
+            zf.writestr(member['name'], _load_chunks(member['chunks']))
+    return buffer.getvalue()
+
+def verify_snapshot(snapshot_id):
+    """Rebuild every file of a snapshot, check it against the manifest and compare it with the live file."""
+    rows = []
+    for path, entry in load_snapshot(snapshot_id)['files'].items():
+        restored = _rebuild_file(entry)
+        intact = content_hash(restored) == entry['sha256']
+        if not os.path.exists(path):
+            live_status = "Missing in live store"
+        elif path.endswith('.xlsx'):
+            same = pd.read_excel(BytesIO(restored)).equals(pd.read_excel(path))
+            live_status = "Same data" if same else "Changed since snapshot"
+        else:
+            with open(path, 'rb') as f:
+                same = content_hash(f.read()) == entry['sha256']
+            live_status = "Same data" if same else "Changed since snapshot"
+        rows.append({'File': path, 'Snapshot_Intact': intact, 'Live_Store': live_status})
+    return pd.DataFrame(rows)
+
+def restore_snapshot(snapshot_id):
+    with _backup_scheduler()['lock']:
+        return _restore_snapshot(snapshot_id)
+
+def _restore_snapshot(snapshot_id):
+    manifest = load_snapshot(snapshot_id)
+    # The audit log stays append-only: it is backed up but never rolled back
+    audit_prefix = AUDIT_DIR + "/"
+    # Rebuild everything first so a missing chunk aborts before any file is touched
+    rebuilt = {path: _rebuild_file(entry) for path, entry in manifest['files'].items() if not path.startswith(audit_prefix)}
+    _take_snapshot(label=f"Before restoring {snapshot_id}")
+    for path in backup_paths():
+        if path not in rebuilt and not path.startswith(audit_prefix):
+            os.chmod(path, 0o644)
+            os.remove(path)
+    for path, data in rebuilt.items():
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".restore", 'wb') as f:
+            f.write(data)
+        # Archive partitions stay read-only, as _write_partition leaves them
+        if path.startswith(ARCHIVE_DIR + "/") and path.endswith(".csv.gz"):
+            os.chmod(path + ".restore", 0o444)
+        if os.path.exists(path):
+            os.chmod(path, 0o644)
+        os.replace(path + ".restore", path)
+    # Rollups are derived from payments; drop them so they are rebuilt from archive and live data
+    if os.path.exists(ROLLUP_FILE):
+        os.remove(ROLLUP_FILE)
+    record_audit([audit_entry('snapshot', snapshot_id, {'Status': 'Saved'}, {'Status': 'Restored'})])
+    return len(rebuilt)
+
+@st.cache_resource(show_spinner=False)
+def _backup_scheduler():
+    return {'lock': threading.Lock()}
+
+def schedule_nightly_backup():
+    """Take a snapshot in the background if the newest one is older than BACKUP_INTERVAL_HOURS."""
+    snapshots = list_snapshots()
+    if snapshots and datetime.now() - datetime.strptime(snapshots[-1][:15], '%Y%m%dT%H%M%S') < timedelta(hours=BACKUP_INTERVAL_HOURS):
+        return
+    lock = _backup_scheduler()['lock']
+    if not lock.acquire(blocking=False):
+        return
+    
+    def run():
+        try:
+            _take_snapshot(label="Scheduled")
+        finally:
+            lock.release()
+    
+    threading.Thread(target=run, daemon=True).start()
+
+def manage_backups():
+    st.header("💾 Backups")
+    
+    if st.button("📸 Take Snapshot Now"):
+        started = time.perf_counter()
+        manifest = take_snapshot(label="Manual")
+        st.success(f"✅ Snapshot {manifest['id']} taken in {time.perf_counter() - started:.2f}s ({manifest['stored_bytes'] / 1024:,.1f} KB of new data stored)")
+    
+    snapshots = list_snapshots()
+    if len(snapshots) == 0:
+        st.info("No snapshots yet.")
+        return
+    
+    summary = pd.DataFrame([
+        {
+            'Snapshot': m['id'],
+            'Created': m['created'],
+            'Label': m['label'],
+            'Files': len(m['files']),
+            'Data_KB': round(m['logical_bytes'] / 1024, 1),
+            'New_Stored_KB': round(m['stored_bytes'] / 1024, 1)
         }
-        </style>
-    """, unsafe_allow_html=True)
+        for m in map(load_snapshot, reversed(snapshots))
+    ])
+    st.dataframe(summary, use_container_width=True, hide_index=True)
+    
+    snapshot_id = st.selectbox("Snapshot", summary['Snapshot'].tolist())
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔍 Verify Snapshot", use_container_width=True):
+            st.dataframe(verify_snapshot(snapshot_id), use_container_width=True, hide_index=True)
+    with col2:
+        confirm = st.checkbox("I understand the current data will be replaced")
+        if st.button("♻️ Restore Snapshot", use_container_width=True, disabled=not confirm):
+            count = restore_snapshot(snapshot_id)
+            st.success(f"✅ Restored {count} files from {snapshot_id}. A snapshot of the previous state was taken first.")
+
+# ============================================================================
+# DATA INTEGRITY
+# ============================================================================
+
+# Checks run as vectorized passes over whole columns. Row-local checks
+# (domains, formats, amounts) are cached in integrity_state.json by row hash,
+# so an incremental scan only evaluates rows that are new or changed since
+# the last scan; checks across rows (duplicates, orphaned payments) are
+# cheap key lookups and always run in full.
+
+INTEGRITY_DATASETS = {
+    'students': (STUDENT_FILE, 'Student_ID'),
+    'fee_structure': (FEE_STRUCTURE_FILE, 'Fee_ID'),
+    'payments': (FEE_PAYMENTS_FILE, 'Payment_ID'),
+}
+
+def _digits(series, length):
+    text = series.astype(str).str.replace(" ", "").str.replace(r'\.0$', '', regex=True)
+    return text.str.fullmatch(rf'\d{{{length}}}').fillna(False).astype(bool)
+
+def _positive(series):
+    return (pd.to_numeric(series, errors='coerce') > 0).fillna(False).astype(bool)
+
+def _row_checks(dataset, df):
+    """(failing rows mask, column, issue, suggested fix) for checks that look at one row at a time."""
+    if dataset == 'students':
+        return [
+            (~df['Standard'].isin(STANDARDS), 'Standard', "Standard not in STANDARDS", "Pick a valid Standard in Update Student"),
+            (~pd.to_numeric(df['Age'], errors='coerce').isin(AGE_OPTIONS), 'Age', "Age outside AGE_OPTIONS", "Correct the age (2-10)"),
+            (~df['Blood_Group'].isin(BLOOD_GROUPS), 'Blood_Group', "Unknown blood group", "Pick a valid blood group"),
+            (~_digits(df['Father_Phone'], 10), 'Father_Phone', "Phone is not 10 digits", "Re-enter the phone number"),
+            (~_digits(df['Mother_Phone'], 10), 'Mother_Phone', "Phone is not 10 digits", "Re-enter the phone number"),
+            (~_digits(df['Aadhar_Details'], 12), 'Aadhar_Details', "Aadhar is not 12 digits", "Re-enter the Aadhar number"),
+        ]
+    elif dataset == 'fee_structure':
+        return [
+            (~df['Standard'].isin(STANDARDS), 'Standard', "Standard not in STANDARDS", "Re-create the fee for a valid Standard"),
+            (~df['Fee_Type'].isin(FEE_TYPES), 'Fee_Type', "Fee type not in FEE_TYPES", "Re-create the fee with a valid type"),
+            (~_positive(df['Amount']), 'Amount', "Amount is zero, negative or missing", "Update the fee amount"),
+        ]
+    else:
+        return [
+            (~df['Fee_Type'].isin(FEE_TYPES), 'Fee_Type', "Fee type not in FEE_TYPES", "Correct the fee type"),
+            (~df['Payment_Mode'].isin(PAYMENT_MODES), 'Payment_Mode', "Payment mode not in PAYMENT_MODES", "Correct the payment mode"),
+            (~_positive(df['Amount']), 'Amount', "Amount is zero, negative or missing", "Correct or remove the payment"),
+            (pd.to_datetime(df['Payment_Date'], errors='coerce').isna(), 'Payment_Date', "Missing or invalid date", "Enter the payment date"),
+        ]
+
+def _relational_checks(frames, archived_student_ids):
+    """(dataset, failing rows mask, column, issue, suggested fix) for checks across rows and datasets."""
+    students, fees, payments = frames['students'], frames['fee_structure'], frames['payments']
+    aadhar = students['Aadhar_Details'].astype(str).str.replace(" ", "").str.replace(r'\.0$', '', regex=True)
+    known_ids = pd.concat([students['Student_ID'], pd.Series(archived_student_ids, dtype=students['Student_ID'].dtype)])
+    return [
+        ('students', students['Student_ID'].duplicated(keep=False), 'Student_ID', "Duplicate Student_ID", "Give one of the students a new ID"),
+        ('students', aadhar.duplicated(keep=False) & students['Aadhar_Details'].notna(), 'Aadhar_Details', "Duplicate Aadhar", "Check for a duplicate admission"),
+        ('fee_structure', fees.duplicated(['Standard', 'Fee_Type', 'Academic_Year'], keep=False), 'Fee_Type', "Fee defined more than once", "Keep one fee per Standard, type and year"),
+        ('payments', payments['Payment_ID'].duplicated(keep=False), 'Payment_ID', "Duplicate Payment_ID", "Renumber one of the payments"),
+        ('payments', ~payments['Student_ID'].isin(known_ids), 'Student_ID', "Payment for unknown student", "Restore the student or reassign the payment"),
+    ]
+
+def _issue_rows(dataset, df, id_column, mask, column, issue, fix):
+    flagged = df[mask.to_numpy()]
+    return [
+        {'Dataset': dataset, 'Record_ID': str(_audit_value(record_id)), 'Column': column, 'Value': str(_audit_value(value)), 'Issue': issue, 'Suggested_Fix': fix}
+        for record_id, value in zip(flagged[id_column], flagged[column])
+    ]
+
+INITIALIZERS = {
+    'students': initialize_student_excel,
+    'fee_structure': initialize_fee_structure,
+    'payments': initialize_fee_payments,
+}
+
+@st.cache_data(show_spinner=False, max_entries=len(INITIALIZERS))
+def _read_workbook(path, version):
+    return pd.read_excel(path)
+
+def _data_versions():
+    versions = {name: str(file_version(path)) for name, (path, _) in INTEGRITY_DATASETS.items()}
+    versions['archive'] = str(file_version(ARCHIVE_INDEX_FILE))
+    return versions
+
+def integrity_scan(incremental=True):
+    """Return (report DataFrame, number of rows whose row-local checks were evaluated)."""
+    state = {}
+    if incremental and os.path.exists(INTEGRITY_STATE_FILE):
+        with open(INTEGRITY_STATE_FILE, encoding='utf-8') as f:
+            state = json.load(f)
+    versions = _data_versions()
+    if incremental and state.get('versions') == versions:
+        return pd.DataFrame(state['report']), 0
+    
+    # Relational checks need every frame, but only changed workbooks are parsed again
+    frames = {}
+    for dataset, (path, _) in INTEGRITY_DATASETS.items():
+        frames[dataset] = _read_workbook(path, file_version(path)) if os.path.exists(path) else INITIALIZERS[dataset]()
+    report, row_cache, dataset_reports, rechecked = [], {}, {}, 0
+    for dataset, df in frames.items():
+        cached = state.get('rows', {}).get(dataset, {})
+        if dataset in state.get('dataset_reports', {}) and state['versions'].get(dataset) == versions[dataset]:
+            # Unchanged file: its row-local results stand without re-hashing
+            row_cache[dataset] = cached
+            dataset_reports[dataset] = state['dataset_reports'][dataset]
+            report += dataset_reports[dataset]
+            continue
+        id_column = INTEGRITY_DATASETS[dataset][1]
+        hashes = pd.util.hash_pandas_object(df, index=False).astype(str).to_numpy()
+        changed = np.array([h not in cached for h in hashes], dtype=bool)
+        rechecked += int(changed.sum())
+        
+        fresh = {}
+        if changed.any():
+            subset = df[changed]
+            for mask, column, issue, fix in _row_checks(dataset, subset):
+                for row_hash, row in zip(hashes[changed][mask.to_numpy()], _issue_rows(dataset, subset, id_column, mask, column, issue, fix)):
+                    fresh.setdefault(row_hash, []).append(row)
+        row_cache[dataset] = {h: cached[h] if h in cached else fresh.get(h, []) for h in hashes}
+        dataset_reports[dataset] = [row for h in hashes for row in row_cache[dataset][h]]
+        report += dataset_reports[dataset]
+    
+    archived_ids = read_archive('students')['Student_ID'].tolist() if archived_years('students') else []
+    for dataset, mask, column, issue, fix in _relational_checks(frames, archived_ids):
+        report += _issue_rows(dataset, frames[dataset], INTEGRITY_DATASETS[dataset][1], mask, column, issue, fix)
+    
+    with open(INTEGRITY_STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'versions': versions, 'rows': row_cache, 'dataset_reports': dataset_reports, 'report': report}, f)
+    return pd.DataFrame(report, columns=['Dataset', 'Record_ID', 'Column', 'Value', 'Issue', 'Suggested_Fix']), rechecked
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _startup_integrity_report(versions):
+    return integrity_scan(incremental=True)[0]
+
+def startup_integrity_issues():
+    """Issue count from an incremental scan, repeated only when a data file changes."""
+    return len(_startup_integrity_report(tuple(_data_versions().items())))
+
+def data_integrity():
+    st.header("🩺 Data Integrity")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        full = st.button("🔎 Full Scan", use_container_width=True)
+    with col2:
+        st.button("⚡ Incremental Scan", use_container_width=True)
+    
+    started = time.perf_counter()
+    report, rechecked = integrity_scan(incremental=not full)
+    st.caption(f"Scanned in {time.perf_counter() - started:.2f}s - {rechecked} rows re-checked")
+    
+    if len(report) == 0:
+        st.success("✅ No integrity issues found.")
+        return
+    
+    st.metric("Issues Found", len(report))
+    st.dataframe(report.groupby(['Dataset', 'Issue']).size().rename('Count').reset_index(), use_container_width=True, hide_index=True)
+    st.dataframe(report, use_container_width=True, hide_index=True)
+    
+    csv = report.to_csv(index=False)
+    st.download_button(
+        label="📥 Download Fix-up Report (CSV)",
+        data=csv,
+        file_name=f"integrity_{datetime.now().strftime('%Y%m%d')}.csv",
+        mime="text/csv"
+    )
+
+# ============================================================================
+# RECEIPTS & STATEMENTS (PDF)
+# ============================================================================
+
+# Minimal PDF writer: documents use the built-in Helvetica fonts, so nothing
+# has to be embedded and a page is just a small compressed text stream.
+
+def _pdf_text(text):
+    return str(text).replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def _pdf_line(x, y, text, font='F1', size=10):
+    return f"BT /{font} {size} Tf {x} {y} Td ({_pdf_text(text)}) Tj ET\n"
+
+@lru_cache(maxsize=None)
+def _pdf_font_objects():
+    return (
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    )
+
+@lru_cache(maxsize=16)
+def _pdf_header(title):
+    # Coloured header band shared by every page of a document type
+    return (
+        "0.400 0.494 0.918 rg 0 772 595 70 re f\n1 1 1 rg\n"
+        + _pdf_line(40, 810, SCHOOL_NAME, 'F2', 18)
+        + _pdf_line(40, 788, title, 'F1', 12)
+        + "0 0 0 rg 0 0 0 RG 0.5 w\n"
+    )
+
+def _pdf_assemble(page_streams):
+    font_regular, font_bold = _pdf_font_objects()
+    kids = " ".join(f"{5 + 2 * i} 0 R" for i in range(len(page_streams)))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(page_streams)} >>".encode(),
+        font_regular,
+        font_bold,
+    ]
+    for i, stream in enumerate(page_streams):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {6 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref_offset = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset))
+    return out.getvalue()
+
+def build_pdf(title, meta, columns, rows, totals):
+    """Render a tabular document. columns is a list of (label, x) pairs, rows a list of tuples."""
+    chunks = [rows[i:i + PDF_ROWS_PER_PAGE] for i in range(0, len(rows), PDF_ROWS_PER_PAGE)] or [[]]
+    pages = []
+    for page_no, chunk in enumerate(chunks, start=1):
+        parts = [_pdf_header(title)]
+        y = 745
+        for label, value in meta:
+            parts.append(_pdf_line(40, y, f"{label}:", 'F2'))
+            parts.append(_pdf_line(170, y, value))
+            y -= 16
+        y -= 14
+        for label, x in columns:
+            parts.append(_pdf_line(x, y, label, 'F2'))
+        parts.append(f"40 {y - 5} m 555 {y - 5} l S\n")
+        y -= 20
+        for row in chunk:
+            for (_, x), value in zip(columns, row):
+                parts.append(_pdf_line(x, y, value))
+            y -= 16
+        if page_no == len(chunks):
+            parts.append(f"40 {y + 8} m 555 {y + 8} l S\n")
+            y -= 8
+            for label, value in totals:
+                parts.append(_pdf_line(300, y, label, 'F2'))
+                parts.append(_pdf_line(450, y, value, 'F2'))
+                y -= 16
+        parts.append(_pdf_line(40, 30, f"Generated on {datetime.now().strftime('%d-%m-%Y %H:%M')}", size=8))
+        parts.append(_pdf_line(500, 30, f"Page {page_no} of {len(chunks)}", size=8))
+        pages.append(zlib.compress("".join(parts).encode('cp1252', 'replace')))
+    return _pdf_assemble(pages)
+
+def _format_amount(amount):
+    return f"Rs. {float(amount):,.2f}"
+
+def _format_date(value):
+    return pd.to_datetime(value).strftime('%d-%m-%Y') if pd.notna(value) else ""
+
+def render_receipt(payment, student_name, standard):
+    meta = [
+        ("Receipt No", f"RCPT-{int(payment['Payment_ID']):06d}"),
+        ("Date", _format_date(payment['Payment_Date'])),
+        ("Student ID", payment['Student_ID']),
+        ("Student Name", student_name),
+        ("Standard", standard),
+        ("Payment Mode", payment['Payment_Mode']),
+    ]
+    notes = payment['Notes'] if pd.notna(payment['Notes']) else ""
+    rows = [(payment['Fee_Type'], notes, _format_amount(payment['Amount']))]
+    columns = [("Fee Type", 40), ("Notes", 220), ("Amount", 450)]
+    return build_pdf("Fee Receipt", meta, columns, rows, [("Total Received", _format_amount(payment['Amount']))])
+
+def render_statement(student, payments, period, fees_due, paid_to_date):
+    meta = [
+        ("Student ID", student['Student_ID']),
+        ("Student Name", student['Name']),
+        ("Standard", student['Standard']),
+        ("Period", period),
+    ]
+    rows = [
+        (f"RCPT-{int(p['Payment_ID']):06d}", _format_date(p['Payment_Date']), p['Fee_Type'], p['Payment_Mode'], _format_amount(p['Amount']))
+        for p in payments
+    ]
+    columns = [("Receipt", 40), ("Date", 130), ("Fee Type", 210), ("Mode", 340), ("Amount", 450)]
+    totals = [
+        ("Paid This Period", _format_amount(sum(p['Amount'] for p in payments))),
+        ("Total Fees Due", _format_amount(fees_due)),
+        ("Paid To Date", _format_amount(paid_to_date)),
+        ("Balance", _format_amount(fees_due - paid_to_date)),
+    ]
+    return build_pdf("Fee Statement", meta, columns, rows, totals)
+
+def render_zip(jobs):
+    """Render (filename, function, args) jobs on a thread pool and stream them into one ZIP."""
+    buffer = BytesIO()
+    with ThreadPoolExecutor(max_workers=PDF_WORKERS) as pool, zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+        # Page streams are already Flate-compressed, so the archive just stores them
+        for (filename, _, _), pdf in zip(jobs, pool.map(lambda job: job[1](*job[2]), jobs)):
+            zf.writestr(filename, pdf)
+    return buffer.getvalue()
+
+def receipt_jobs(pay_df, students_df, standard, start_date, end_date):
+    pay_df = pay_df.merge(students_df[['Student_ID', 'Name', 'Standard']], on='Student_ID', how='left')
+    pay_df['Payment_Date'] = pd.to_datetime(pay_df['Payment_Date'])
+    mask = (pay_df['Payment_Date'] >= pd.to_datetime(start_date)) & (pay_df['Payment_Date'] <= pd.to_datetime(end_date))
+    if standard != "All":
+        mask &= pay_df['Standard'] == standard
+    return [
+        (f"receipt_RCPT-{int(p['Payment_ID']):06d}.pdf", render_receipt, (p, p['Name'], p['Standard']))
+        for p in pay_df[mask].to_dict('records')
+    ]
+
+def statement_jobs(pay_df, students_df, fee_df, standard, start_date, end_date, academic_year):
+    if standard != "All":
+        students_df = students_df[students_df['Standard'] == standard]
+    pay_df = pay_df.copy()
+    pay_df['Payment_Date'] = pd.to_datetime(pay_df['Payment_Date'])
+    # Paid To Date must cover the same academic year as the fees it is set against
+    year_start, year_end = academic_year_bounds(academic_year)
+    in_year = pay_df[(pay_df['Payment_Date'] >= pd.Timestamp(year_start)) & (pay_df['Payment_Date'] <= pd.Timestamp(year_end))]
+    paid_to_date = in_year.groupby('Student_ID')['Amount'].sum()
+    in_period = pay_df[(pay_df['Payment_Date'] >= pd.to_datetime(start_date)) & (pay_df['Payment_Date'] <= pd.to_datetime(end_date))]
+    period_payments = {sid: group.sort_values('Payment_Date').to_dict('records') for sid, group in in_period.groupby('Student_ID')}
+    fees_due = fee_df[fee_df['Academic_Year'] == academic_year].groupby('Standard')['Amount'].sum()
+    period = f"{start_date.strftime('%d-%m-%Y')} to {end_date.strftime('%d-%m-%Y')}"
+    return [
+        (
+            f"statement_{int(s['Student_ID'])}_{start_date.strftime('%Y%m%d')}.pdf",
+            render_statement,
+            (s, period_payments.get(s['Student_ID'], []), period, float(fees_due.get(s['Standard'], 0)), float(paid_to_date.get(s['Student_ID'], 0))),
+        )
+        for s in students_df.to_dict('records')
+    ]
+
+def receipts_and_statements():
+    st.header("🧾 Receipts & Statements")
+    
+    students_df = initialize_student_excel()
+    pay_df = initialize_fee_payments()
+    fee_df = initialize_fee_structure()
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        doc_type = st.radio("Document Type", ["Fee Receipts", "Fee Statements"])
+        standard = st.selectbox("Standard", ["All"] + STANDARDS)
+    with col2:
+        start_date = st.date_input("Start Date", value=datetime.now().date().replace(day=1))
+        end_date = st.date_input("End Date", value=datetime.now().date())
+        current_year = academic_year_label(datetime.now().date())
+        fee_years = sorted(set(fee_df['Academic_Year'].dropna().astype(str)) | {current_year}, reverse=True)
+        academic_year = st.selectbox("Academic Year", fee_years, index=option_index(fee_years, current_year))
+    
+    if st.button("🧾 Generate PDFs"):
+        started = time.perf_counter()
+        if doc_type == "Fee Statements" and academic_year_bounds(academic_year) is None:
+            st.warning(f"Cannot read the start year from '{academic_year}'.")
+            return
+        if doc_type == "Fee Receipts":
+            jobs = receipt_jobs(pay_df, students_df, standard, start_date, end_date)
+        else:
+            jobs = statement_jobs(pay_df, students_df, fee_df, standard, start_date, end_date, academic_year)
+        
+        if len(jobs) == 0:
+            st.info("No records for the selected filters.")
+            return
+        
+        archive = render_zip(jobs)
+        st.success(f"✅ Rendered {len(jobs)} documents in {time.perf_counter() - started:.2f}s")
+        st.download_button(
+            label="📥 Download ZIP",
+            data=archive,
+            file_name=f"{'receipts' if doc_type == 'Fee Receipts' else 'statements'}_{start_date}_{end_date}.zip",
+            mime="application/zip"
+        )
+
+# ============================================================================
+# ATTENDANCE
+# ============================================================================
+
+# Attendance is kept as two bitmaps per school day (one bit per student):
+# "marked" is set when the student was on the roll call, "present" when they
+# attended. Columns follow the order of student_ids; new students are appended,
+# which only adds zero bits on the right of every packed row.
+
+@st.cache_resource(show_spinner=False)
+def attendance_lock():
+    # Roll calls load, modify and rewrite the whole file; one at a time per process
+    return threading.RLock()
+
+def initialize_attendance():
+    with attendance_lock():
+        if not os.path.exists(ATTENDANCE_FILE):
+            student_ids = np.empty(0, dtype=np.int64)
+            days = np.empty(0, dtype=np.int32)
+            present = np.zeros((0, 0), dtype=np.uint8)
+            marked = np.zeros((0, 0), dtype=np.uint8)
+            save_attendance(student_ids, days, present, marked)
+            return student_ids, days, present, marked
+    with np.load(ATTENDANCE_FILE) as data:
+        return data['student_ids'], data['days'], data['present'], data['marked']
+
+def save_attendance(student_ids, days, present, marked):
+    # Written aside and swapped in, so readers never open a half-written archive
+    with open(ATTENDANCE_FILE + ".tmp", 'wb') as f:
+        np.savez_compressed(f, student_ids=student_ids, days=days, present=present, marked=marked)
+    os.replace(ATTENDANCE_FILE + ".tmp", ATTENDANCE_FILE)
+
+def mark_attendance(day, roll_ids, present_ids):
+    with attendance_lock():
+        _mark_attendance(day, roll_ids, present_ids)
+
+def _mark_attendance(day, roll_ids, present_ids):
+    student_ids, days, present, marked = initialize_attendance()
+    
+    new_ids = np.setdiff1d(roll_ids, student_ids)
+    if len(new_ids) > 0:
+        student_ids = np.concatenate([student_ids, new_ids])
+        extra = (len(student_ids) + 7) // 8 - present.shape[1]
+        present = np.pad(present, ((0, 0), (0, extra)))
+        marked = np.pad(marked, ((0, 0), (0, extra)))
+    
+    ordinal = day.toordinal()
+    pos = int(np.searchsorted(days, ordinal))
+    if pos == len(days) or days[pos] != ordinal:
+        days = np.insert(days, pos, ordinal)
+        present = np.insert(present, pos, 0, axis=0)
+        marked = np.insert(marked, pos, 0, axis=0)
+    
+    cols = pd.Index(student_ids).get_indexer(roll_ids)
+    row_present = np.unpackbits(present[pos], count=len(student_ids)).astype(bool)
+    row_marked = np.unpackbits(marked[pos], count=len(student_ids)).astype(bool)
+    row_marked[cols] = True
+    row_present[cols] = np.isin(roll_ids, present_ids)
+    present[pos] = np.packbits(row_present)
+    marked[pos] = np.packbits(row_marked)
+    
+    save_attendance(student_ids, days, present, marked)
+
+def attendance_for_day(day, roll_ids):
+    """Presence of each student on a day, or None if no roll call was taken for them yet."""
+    student_ids, days, present, marked = initialize_attendance()
+    pos = int(np.searchsorted(days, day.toordinal()))
+    if pos == len(days) or days[pos] != day.toordinal():
+        return None
+    cols = pd.Index(student_ids).get_indexer(roll_ids)
+    if (cols < 0).any():
+        return None
+    row_marked = np.unpackbits(marked[pos], count=len(student_ids)).astype(bool)[cols]
+    if not row_marked.all():
+        return None
+    return np.unpackbits(present[pos], count=len(student_ids)).astype(bool)[cols]
+
+def attendance_counts(start_date, end_date):
+    """Days present and days on the roll per student between two dates (inclusive)."""
+    student_ids, days, present, marked = initialize_attendance()
+    lo = np.searchsorted(days, start_date.toordinal(), side='left')
+    hi = np.searchsorted(days, end_date.toordinal(), side='right')
+    count = len(student_ids)
+    return pd.DataFrame({
+        'Student_ID': student_ids,
+        'Days_Present': np.unpackbits(present[lo:hi], axis=1, count=count).sum(axis=0, dtype=np.int32),
+        'School_Days': np.unpackbits(marked[lo:hi], axis=1, count=count).sum(axis=0, dtype=np.int32),
+    })
+
+def attendance_summary(students_df, start_date, end_date):
+    summary = students_df[['Student_ID', 'Name', 'Standard']].merge(attendance_counts(start_date, end_date), on='Student_ID', how='left')
+    summary[['Days_Present', 'School_Days']] = summary[['Days_Present', 'School_Days']].fillna(0).astype(int)
+    summary['Attendance_%'] = (100 * summary['Days_Present'] / summary['School_Days'].where(summary['School_Days'] > 0)).round(1)
+    return summary
+
+def month_bounds(day):
+    return day.replace(day=1), day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+def roll_call():
+    st.header("✅ Class Roll Call")
+    students_df = initialize_student_excel()
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        standard = st.selectbox("Standard", STANDARDS)
+    with col2:
+        day = st.date_input("Date", value=datetime.now().date())
+    
+    class_df = students_df[students_df['Standard'] == standard][['Student_ID', 'Name']].reset_index(drop=True)
+    if len(class_df) == 0:
+        st.info(f"No students in {standard}.")
+        return
+    
+    roll_ids = class_df['Student_ID'].to_numpy()
+    existing = attendance_for_day(day, roll_ids)
+    if existing is not None:
+        st.caption("Roll call already taken for this day - saving will overwrite it.")
+    class_df['Present'] = existing if existing is not None else True
+    
+    edited = st.data_editor(
+        class_df,
+        hide_index=True,
+        disabled=['Student_ID', 'Name'],
+        use_container_width=True,
+        key=f"roll_call_{standard}_{day}"
+    )
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Present", f"{int(edited['Present'].sum())} / {len(edited)}")
+    with col2:
+        if st.button("💾 Save Attendance", use_container_width=True):
+            mark_attendance(day, roll_ids, edited.loc[edited['Present'], 'Student_ID'].to_numpy())
+            st.success(f"✅ Attendance saved for {standard} on {day.strftime('%d-%m-%Y')}")
+
+def monthly_attendance_report():
+    st.header("📈 Monthly Attendance")
+    students_df = initialize_student_excel()
+    
+    day = st.date_input("Month", value=datetime.now().date())
+    start_date, end_date = month_bounds(day)
+    summary = attendance_summary(students_df, start_date, end_date)
+    
+    if summary['School_Days'].sum() == 0:
+        st.info(f"No attendance recorded for {start_date.strftime('%B %Y')}.")
+        return
+    
+    class_summary = summary.groupby('Standard')[['Days_Present', 'School_Days']].sum()
+    class_summary['Attendance_%'] = (100 * class_summary['Days_Present'] / class_summary['School_Days']).round(1)
+    st.subheader(f"Class-wise Attendance - {start_date.strftime('%B %Y')}")
+    st.bar_chart(class_summary['Attendance_%'])
+    st.dataframe(class_summary, use_container_width=True)
+    
+    st.subheader("Student-wise Attendance")
+    st.dataframe(summary, use_container_width=True, hide_index=True)
+    
+    csv = summary.to_csv(index=False)
+    st.download_button(
+        label="📥 Download Attendance (CSV)",
+        data=csv,
+        file_name=f"attendance_{start_date.strftime('%Y%m')}.csv",
+        mime="text/csv"
+    )
+
+def absentee_report():
+    st.header("🚫 Absentee Report")
+    students_df = initialize_student_excel()
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        day = st.date_input("Date", value=datetime.now().date())
+    with col2:
+        threshold = st.slider("Flag attendance below (%)", 0, 100, 75)
+    
+    today = attendance_summary(students_df, day, day)
+    absent_today = today[(today['School_Days'] > 0) & (today['Days_Present'] == 0)]
+    st.subheader(f"Absent on {day.strftime('%d-%m-%Y')}")
+    if len(absent_today) > 0:
+        st.dataframe(absent_today[['Student_ID', 'Name', 'Standard']], use_container_width=True, hide_index=True)
+    else:
+        st.info("No absentees recorded for this day.")
+    
+    start_date, end_date = month_bounds(day)
+    month = attendance_summary(students_df, start_date, end_date)
+    low = month[month['Attendance_%'] < threshold].sort_values('Attendance_%')
+    st.subheader(f"Below {threshold}% in {start_date.strftime('%B %Y')}")
+    if len(low) > 0:
+        st.dataframe(low, use_container_width=True, hide_index=True)
+    else:
+        st.info("No students below the threshold.")
+
+# ============================================================================
+# STARTUP METRICS
+# ============================================================================
+
+HEAVY_MODULES = ["pandas", "numpy", "openpyxl"]
+
+def _loaded_heavy_modules():
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+def record_startup_metrics(stage):
+    """Append import time and time to first render for the first 'login' and 'app' render of a session.
+
+    Import_ms is what this render paid for lazy imports; it is 0 once an
+    earlier session in the same process has already loaded them. Each module's
+    time includes what it imports itself (numpy under pandas). openpyxl is
+    imported by pandas itself, so its cost shows up in First_Render_ms only.
+    """
+    recorded = st.session_state.setdefault('startup_recorded', [])
+    if stage in recorded:
+        return
+    recorded.append(stage)
+    is_new = not os.path.exists(STARTUP_METRICS_FILE)
+    with open(STARTUP_METRICS_FILE, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if is_new:
+            writer.writerow(['Timestamp', 'Stage', 'Import_ms', 'First_Render_ms', 'Heavy_Modules_Loaded', 'Module_Import_ms'])
+        writer.writerow([
+            datetime.now().isoformat(timespec='seconds'),
+            stage,
+            f"{sum(IMPORT_SECONDS.values()) * 1000:.1f}",
+            f"{(time.perf_counter() - _SCRIPT_STARTED) * 1000:.1f}",
+            " ".join(_loaded_heavy_modules()),
+            " ".join(f"{name}={seconds * 1000:.1f}" for name, seconds in IMPORT_SECONDS.items())
+        ])
+
+# ============================================================================
+# MAIN APPLICATION
+# ============================================================================
+
+def main():
+    init_session_state()
+    check_url_params()
+    
+    if not st.session_state.logged_in or st.session_state.role not in ROLES:
+        login_page()
+        record_startup_metrics('login')
+        return
+    
+    # Initialize device_mode if not already set
+    if 'device_mode' not in st.session_state:
+        st.session_state.device_mode = 'desktop'
+    
+    # Theme, device-mode and sidebar styles are built once per process
+    st.markdown(app_css(st.session_state.device_mode), unsafe_allow_html=True)
     
     # RESPONSIVE LAYOUT BASED ON DEVICE MODE
     if st.session_state.device_mode == 'desktop':
         # DESKTOP VIEW - Full Width
-        st.markdown("""
-            <style>
-            /* Desktop - Full width, large fonts */
-            body { font-size: 16px !important; }
-            h1 { font-size: 48px !important; }
-            h2 { font-size: 36px !important; }
-            h3 { font-size: 28px !important; }
-            .stButton button { font-size: 16px !important; padding: 12px 24px !important; }
-            .stSelectbox { font-size: 16px !important; }
-            .stTextInput input { font-size: 16px !important; }
-            [data-testid="stMetric"] { font-size: 18px !important; }
-            </style>
-        """, unsafe_allow_html=True)
         max_width = 1400
         col_ratio_main = [3, 1]
         col_ratio_2 = [1, 1]
@@ -655,19 +2833,6 @@ def main():
         
     elif st.session_state.device_mode == 'tablet':
         # TABLET VIEW - Medium Width
-        st.markdown("""
-            <style>
-            /* Tablet - Medium width, medium fonts */
-            body { font-size: 14px !important; }
-            h1 { font-size: 36px !important; }
-            h2 { font-size: 28px !important; }
-            h3 { font-size: 22px !important; }
-            .stButton button { font-size: 14px !important; padding: 10px 20px !important; }
-            .stSelectbox { font-size: 14px !important; }
-            .stTextInput input { font-size: 14px !important; }
-            [data-testid="stMetric"] { font-size: 14px !important; }
-            </style>
-        """, unsafe_allow_html=True)
         max_width = 900
         col_ratio_main = [2, 1]
         col_ratio_2 = [1, 1]
@@ -677,19 +2842,6 @@ def main():
         
     else:  # mobile
         # MOBILE VIEW - Narrow Width
-        st.markdown("""
-            <style>
-            /* Mobile - Narrow width, small fonts */
-            body { font-size: 12px !important; }
-            h1 { font-size: 28px !important; }
-            h2 { font-size: 20px !important; }
-            h3 { font-size: 16px !important; }
-            .stButton button { font-size: 12px !important; padding: 8px 16px !important; }
-            .stSelectbox { font-size: 12px !important; }
-            .stTextInput input { font-size: 12px !important; }
-            [data-testid="stMetric"] { font-size: 12px !important; }
-            </style>
-        """, unsafe_allow_html=True)
         max_width = 600
         col_ratio_main = [1, 0]  # Full width, no sidebar in mobile
         col_ratio_2 = [1]  # Single column
@@ -708,154 +2860,14 @@ def main():
     with col2:
         if st.button("🚪 Logout"):
             st.session_state.logged_in = False
+            st.session_state.role = None
             st.rerun()
     
     st.markdown("---")
     
-    # Initialize data
-    initialize_student_excel()
-    initialize_fee_structure()
-    initialize_fee_payments()
-    
-    # Sidebar Navigation - DARK THEME (BLACK BACKGROUND)
-    st.sidebar.markdown('''
-        <style>
-        @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@700;800;900&family=Poppins:wght@700;800;900&display=swap');
-        
-        /* General sidebar styling - BLACK BACKGROUND, NO GLASSMORPHISM */
-        [data-testid="stSidebar"] {
-            background: #1a1a1a !important;
-            backdrop-filter: none !important;
-        }
-        
-        [data-testid="stSidebar"]{
-            font-size: 24px !important;
-        }
-        
-        [data-testid="stSidebar"] label {
-            font-size: 24px !important; 
-            font-weight: 800 !important;
-            color: #ffffff !important;
-            letter-spacing: 0.5px !important;
-        }
-        
-        /* MAIN MENU AND OPERATIONS HEADERS - BALANCED SIZE */
-        [data-testid="stSidebar"] .stRadio > label {
-            font-size: 48px !important;
-            font-weight: 900 !important;
-            color: #ffffff !important;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.1) !important;
-            letter-spacing: 1px !important;
-            -webkit-text-stroke: 1px rgba(0,0,0,0.3) !important;
-            line-height: 1.2 !important;
-            font-family: 'Poppins', 'Arial Black', 'Roboto Black', sans-serif !important;
-            margin: 15px 0 !important;
-            padding: 10px 5px !important;
-            text-transform: uppercase !important;
-            word-wrap: break-word !important;
-        }
-        
-        /* MENU ITEMS - LARGE BUT READABLE */
-        [data-testid="stSidebar"] .stRadio div[role="radiogroup"] label {
-            font-size: 56px !important;
-            padding: 12px 8px !important;
-            font-weight: 900 !important;
-            color: #ffffff !important;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.1) !important;
-            -webkit-text-stroke: 1px rgba(0,0,0,0.3) !important;
-            line-height: 1.3 !important;
-            font-family: 'Poppins', 'Arial Black', 'Roboto Black', sans-serif !important;
-            margin: 8px 0 !important;
-            border-radius: 6px !important;
-            transition: all 0.3s ease !important;
-            text-transform: capitalize !important;
-        }
-        
-        /* Menu item hover effect - ENHANCED */
-        [data-testid="stSidebar"] .stRadio div[role="radiogroup"] label:hover {
-            background-color: rgba(45, 90, 160, 0.15) !important;
-            transform: scale(1.05) !important;
-            letter-spacing: 1px !important;
-            color: #ffffff !important;
-            box-shadow: 0 2px 8px rgba(45, 90, 160, 0.3) !important;
-        }
-        
-        /* Selected menu item styling - GOLD ACCENT */
-        [data-testid="stSidebar"] .stRadio div[role="radiogroup"] label[aria-checked="true"] {
-            background-color: rgba(255, 215, 0, 0.2) !important;
-            border-left: 4px solid #ffd700 !important;
-            padding-left: 10px !important;
-            color: #ffffff !important;
-            box-shadow: 0 2px 8px rgba(255, 215, 0, 0.3) !important;
-        }
-        
-        /* Sidebar title styling */
-        [data-testid="stSidebar"] h1 {
-            font-size: 36px !important;
-            font-weight: 900 !important;
-            color: #ffffff !important;
-            text-shadow: 1px 1px 3px rgba(0,0,0,0.1) !important;
-            -webkit-text-stroke: 0.8px rgba(0,0,0,0.2) !important;
-            font-family: 'Poppins', 'Arial Black', 'Roboto Black', sans-serif !important;
-            margin-bottom: 15px !important;
-            letter-spacing: 1px !important;
-            text-transform: uppercase !important;
-        }
-        
-        /* Paragraph text in sidebar */
-        [data-testid="stSidebar"] p {
-            font-size: 18px !important;
-            font-weight: 700 !important;
-            color: #ffffff !important;
-            margin: 8px 0 !important;
-        }
-        
-        /* Streamlit radio button styling */
-        [data-testid="stSidebar"] .stRadio {
-            background-color: transparent !important;
-        }
-        
-        /* Device Switcher Styling */
-        .device-switcher {
-            display: flex;
-            gap: 10px;
-            justify-content: center;
-            align-items: center;
-            margin: 20px 0;
-            padding: 15px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            border-radius: 10px;
-            box-shadow: 0 4px 15px rgba(102, 126, 234, 0.3);
-        }
-        
-        .device-btn {
-            background: rgba(255, 255, 255, 0.2);
-            border: 2px solid #ffffff;
-            color: #ffffff;
-            padding: 10px 15px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 20px;
-            font-weight: bold;
-            transition: all 0.3s ease;
-            text-align: center;
-            width: 60px;
-        }
-        
-        .device-btn:hover {
-            background: rgba(255, 255, 255, 0.4);
-            transform: scale(1.1);
-            box-shadow: 0 4px 12px rgba(255, 255, 255, 0.3);
-        }
-        
-        .device-btn.active {
-            background: #ffd700;
-            color: #667eea;
-            border-color: #ffd700;
-            box-shadow: 0 4px 15px rgba(255, 215, 0, 0.5);
-        }
-        </style>
-    ''', unsafe_allow_html=True)
+    # Workbooks are initialized by the pages that read them; only the
+    # once-a-day snapshot check runs on every render
+    schedule_nightly_backup()
     
     # Device Switcher Section - HORIZONTAL (Full Width)
     st.sidebar.markdown("<div style='margin-bottom: 20px;'></div>", unsafe_allow_html=True)
@@ -876,10 +2888,10 @@ def main():
     
     st.sidebar.title("📚 Navigation")
     
-    main_menu = st.sidebar.radio("Main Menu:", ["👨‍🎓 Student Management", "💰 Fees Management"])
+    main_menu = st.sidebar.radio("Main Menu:", ROLES[st.session_state.role])
     
     if main_menu == "👨‍🎓 Student Management":
-        student_menu = st.sidebar.radio("Operations:", ["📊 View Students", "➕ Add Student", "✏️ Update Student", "🗑️ Delete Student", "📥 Import Students"])
+        student_menu = st.sidebar.radio("Operations:", ["📊 View Students", "➕ Add Student", "✏️ Update Student", "🗑️ Delete Student", "📥 Import Students", "🗄️ Archive"])
         
         if student_menu == "📊 View Students":
             view_students()
@@ -891,9 +2903,11 @@ def main():
             delete_student()
         elif student_menu == "📥 Import Students":
             import_students()
+        elif student_menu == "🗄️ Archive":
+            archive_page()
     
-    else:
-        fees_menu = st.sidebar.radio("Operations:", ["⚙️ Fee Structure", "💵 Collect Payment", "📋 View Payments", "🔍 Student Fee History", "📄 Reports"])
+    elif main_menu == "💰 Fees Management":
+        fees_menu = st.sidebar.radio("Operations:", ["⚙️ Fee Structure", "💵 Collect Payment", "📋 View Payments", "🔍 Student Fee History", "📄 Reports", "📊 Dashboard", "🧾 Receipts & Statements", "👨‍👩‍👧 Family Fees"])
         
         if fees_menu == "⚙️ Fee Structure":
             manage_fee_structure()
@@ -905,6 +2919,42 @@ def main():
             student_fee_history()
         elif fees_menu == "📄 Reports":
             generate_reports()
+        elif fees_menu == "📊 Dashboard":
+            collections_dashboard()
+        elif fees_menu == "🧾 Receipts & Statements":
+            receipts_and_statements()
+        elif fees_menu == "👨‍👩‍👧 Family Fees":
+            family_fees()
+    
+    elif main_menu == "📅 Attendance":
+        attendance_menu = st.sidebar.radio("Operations:", ["✅ Roll Call", "📈 Monthly Report", "🚫 Absentee Report"])
+        
+        if attendance_menu == "✅ Roll Call":
+            roll_call()
+        elif attendance_menu == "📈 Monthly Report":
+            monthly_attendance_report()
+        elif attendance_menu == "🚫 Absentee Report":
+            absentee_report()
+    
+    elif main_menu == "🕓 Audit Log":
+        audit_log_page()
+    
+    elif main_menu == "👥 Users":
+        manage_users()
+    
+    elif main_menu == "💾 Backups":
+        manage_backups()
+    
+    elif main_menu == "🩺 Data Integrity":
+        data_integrity()
+    
+    record_startup_metrics('app')
+    
+    # Checked after the page has rendered so it never delays first paint
+    if st.session_state.role == 'admin':
+        issues = startup_integrity_issues()
+        if issues > 0:
+            st.sidebar.warning(f"🩺 {issues} data issue(s) found - see Data Integrity")
 
 if __name__ == "__main__":
     main()